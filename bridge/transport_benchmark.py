@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Compare IPC round-trip latency of the notifications bridge across transports.
+
+Starts an in-process bridge over a synthetic snapshot (no WinRT needed) and
+times ``ping`` and ``read_notifications`` on every transport this platform
+supports: TCP loopback, AF_UNIX sockets and Windows named pipes.
+
+Run from the repository root: ``python -m bridge.transport_benchmark``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from bridge.windows_notifications_daemon import (
+    NotificationCollector,
+    NotificationRecord,
+    TcpBridgeServer,
+)
+
+
+class _BenchmarkCollector(NotificationCollector):
+    """Collector serving a fixed snapshot, as if WinRT push were active."""
+
+    def is_push_subscription_active(self) -> bool:
+        return True
+
+
+def _records(count: int) -> List[NotificationRecord]:
+    return [
+        NotificationRecord(
+            timestamp=f"2024-01-01T00:00:{index % 60:02d}.000000Z",
+            title=f"Notification {index}",
+            body="Benchmark body text " * 4,
+            app="Benchmark",
+            notification_id=index,
+        )
+        for index in range(count)
+    ]
+
+
+async def _round_trips(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    message_type: str,
+    iterations: int,
+) -> List[float]:
+    frame = (json.dumps({"id": "bench", "type": message_type}) + "\n").encode("utf-8")
+    samples: List[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        writer.write(frame)
+        await reader.readline()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50Us": round(statistics.median(ordered) * 1e6, 1),
+        "p99Us": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e6, 1),
+        "meanUs": round(statistics.fmean(ordered) * 1e6, 1),
+    }
+
+
+async def _benchmark(iterations: int, notifications: int) -> Dict[str, Dict[str, object]]:
+    loop = asyncio.get_running_loop()
+    collector = _BenchmarkCollector(loop)
+    collector._available = True
+    await collector._publish_snapshot(_records(notifications))
+
+    workdir = tempfile.mkdtemp(prefix="bridge-bench-")
+    transports: List[Tuple[str, TcpBridgeServer]] = [
+        ("tcp", TcpBridgeServer("127.0.0.1", 0, collector))
+    ]
+    if hasattr(asyncio, "start_unix_server"):
+        path = os.path.join(workdir, "bridge.sock")
+        transports.append(
+            ("unix", TcpBridgeServer("", 0, collector, tcp_enabled=False, unix_paths=[path]))
+        )
+    if hasattr(loop, "start_serving_pipe"):
+        name = rf"\\.\pipe\notifications-bench-{os.getpid()}"
+        transports.append(
+            ("pipe", TcpBridgeServer("", 0, collector, tcp_enabled=False, pipe_names=[name]))
+        )
+
+    results: Dict[str, Dict[str, object]] = {}
+    for transport, bridge in transports:
+        address = (await bridge.start_listeners())[0]
+        try:
+            if transport == "tcp":
+                port = int(address.rsplit(":", 1)[1])
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            elif transport == "unix":
+                reader, writer = await asyncio.open_unix_connection(bridge.unix_paths[0])
+            else:
+                reader = asyncio.StreamReader()
+                protocol = asyncio.StreamReaderProtocol(reader)
+                pipe, _ = await loop.create_pipe_connection(
+                    lambda: protocol, bridge.pipe_names[0]
+                )
+                writer = asyncio.StreamWriter(pipe, protocol, reader, loop)
+
+            # Warm up connection state and the cached snapshot encoding.
+            await _round_trips(reader, writer, "read_notifications", 10)
+            results[transport] = {
+                "ping": _summary(await _round_trips(reader, writer, "ping", iterations)),
+                "read_notifications": _summary(
+                    await _round_trips(reader, writer, "read_notifications", iterations)
+                ),
+            }
+            writer.close()
+            await writer.wait_closed()
+            # Let the server-side handler observe EOF before its listener closes.
+            await asyncio.sleep(0.05)
+        finally:
+            await bridge.close_listeners()
+    os.rmdir(workdir)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--notifications", type=int, default=50)
+    args = parser.parse_args()
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+    results = asyncio.run(_benchmark(max(args.iterations, 1), max(args.notifications, 0)))
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
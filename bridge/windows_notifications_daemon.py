@@ -5,17 +5,38 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import base64
+import cProfile
 import datetime as dt
 import enum
+import hashlib
+import heapq
 import inspect
 import importlib
 import json
 import logging
+import mmap
+import os
+import pstats
+import re
 import signal
+import stat
+import struct
+import sys
 import threading
+import time
 import types
-from dataclasses import dataclass
-from typing import Awaitable, Callable, Dict, List, Optional, Set
+import unicodedata
+import zlib
+from collections import Counter, deque
+from collections.abc import Sequence
+from dataclasses import dataclass, field, replace
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
 
 
 LOGGER = logging.getLogger("windows_notifications_daemon")
@@ -29,12 +50,163 @@ def _truncate_for_log(value: Optional[str], max_length: int = 120) -> Optional[s
     return f"{value[: max_length - 1]}…"
 
 
-@dataclass
+def _content_fingerprint(*values: Optional[str]) -> str:
+    digest = hashlib.blake2b(digest_size=8)
+    for value in values:
+        digest.update(b"\x00" if value is None else value.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+# Characters removed by JavaScript's ``String.prototype.trim`` and matched by
+# ``\s``; Python's ``str.strip()`` differs on a few (U+FEFF, U+001C..U+001F).
+_JS_WHITESPACE = (
+    "\t\n\v\f\r \u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006"
+    "\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+)
+
+
+def _js_trim(value: str) -> str:
+    return value.strip(_JS_WHITESPACE)
+
+
+def _forward_signature(
+    timestamp: Optional[str],
+    app: Optional[str],
+    title: Optional[str],
+    body: Optional[str],
+) -> str:
+    """Hash of ``buildNotificationSignature(normalizeNotificationForForward(item))``.
+
+    Text is trimmed, blank title/body become empty and a blank app becomes
+    ``Unknown app``, exactly like the Node forwarding code, before the
+    ``timestamp|app|title|body`` string is hashed.
+    """
+    title = _js_trim(title) if isinstance(title, str) else ""
+    body = _js_trim(body) if isinstance(body, str) else ""
+    app = (_js_trim(app) if isinstance(app, str) else "") or "Unknown app"
+    timestamp = timestamp if isinstance(timestamp, str) else ""
+    digest = hashlib.blake2b(
+        "|".join((timestamp, app, title, body)).encode("utf-8"), digest_size=8
+    )
+    return digest.hexdigest()
+
+
+def _record_sort_key(record) -> str:
+    return record.timestamp or ""
+
+
+def _newest_records(records, limit: int) -> List["NotificationRecord"]:
+    """Newest-first top ``limit`` records; stable for equal timestamps."""
+    if len(records) <= limit:
+        return sorted(records, key=_record_sort_key, reverse=True)
+    return heapq.nlargest(limit, records, key=_record_sort_key)
+
+
+def _snapshot_fingerprint(records) -> str:
+    """Version of an ordered snapshot, derived from per-record fingerprints."""
+    digest = hashlib.blake2b(digest_size=8)
+    for record in records:
+        digest.update(record.fingerprint.encode("ascii"))
+    return digest.hexdigest()
+
+
+def _is_nickname_char(char: str) -> bool:
+    return char == "_" or unicodedata.category(char)[0] in ("L", "N")
+
+
+def normalize_nickname(value) -> Optional[str]:
+    """Python equivalent of ``normalizeClanNicknameForMatch`` (clan-notification-matching.js)."""
+    if not isinstance(value, str):
+        return None
+    trimmed = _js_trim(value).lower()
+    start = 0
+    end = len(trimmed)
+    while start < end and not _is_nickname_char(trimmed[start]):
+        start += 1
+    while end > start and not _is_nickname_char(trimmed[end - 1]):
+        end -= 1
+    normalized = _js_trim(trimmed[start:end])
+    return normalized or None
+
+
+# JavaScript's ``\b`` only knows ASCII word characters and its ``\s`` includes
+# U+FEFF, so both are spelled out to keep matches identical to the Node side.
+_JS_WORD = "A-Za-z0-9_"
+_JS_BOUNDARY = rf"(?:(?<![{_JS_WORD}])(?=[{_JS_WORD}])|(?<=[{_JS_WORD}])(?![{_JS_WORD}]))"
+_JS_SPACE = f"[{_JS_WHITESPACE}]"
+_JS_NON_SPACE = f"[^{_JS_WHITESPACE}]"
+_FLAG = r"(?::flag_[a-z]{2}:|[\U0001F1E6-\U0001F1FF]{2})"
+_HATCHED_WORD_RE = re.compile(rf"{_JS_BOUNDARY}hatched{_JS_BOUNDARY}", re.IGNORECASE)
+_HATCHED_SEGMENT_RE = re.compile(rf"(.+?{_JS_BOUNDARY}hatched{_JS_BOUNDARY})", re.IGNORECASE)
+# Mirrors HATCHED_NICKNAME_REGEXES. The first JS pattern also allows a run of
+# emoji before "congrats"; that prefix never changes the captured nickname,
+# so it is omitted here (Python's ``re`` has no emoji property classes).
+_HATCHED_NICKNAME_RES = tuple(
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        rf"(?:^|{_JS_BOUNDARY})(?:congrats!?{_JS_SPACE}+)(?:{_FLAG}{_JS_SPACE}+)?"
+        rf"({_JS_NON_SPACE}.*?){_JS_SPACE}+hatched{_JS_BOUNDARY}",
+        rf"(?:^|{_JS_BOUNDARY})(?:{_FLAG}{_JS_SPACE}+)"
+        rf"({_JS_NON_SPACE}.*?){_JS_SPACE}+hatched{_JS_BOUNDARY}",
+        rf"(?:^|{_JS_BOUNDARY})({_JS_NON_SPACE}.*?){_JS_SPACE}+hatched{_JS_BOUNDARY}",
+    )
+)
+_JS_SPACE_RUN_RE = re.compile(rf"{_JS_SPACE}+")
+
+
+def extract_hatched_nickname(text) -> Optional[str]:
+    """Python equivalent of ``extractNicknameBeforeHatched`` (clan-notification-matching.js)."""
+    if not isinstance(text, str):
+        return None
+    flattened = _js_trim(_JS_SPACE_RUN_RE.sub(" ", text))
+    if not flattened or _HATCHED_WORD_RE.search(flattened) is None:
+        return None
+    segment_match = _HATCHED_SEGMENT_RE.search(flattened)
+    segment = segment_match.group(1) if segment_match else flattened
+    for regex in _HATCHED_NICKNAME_RES:
+        match = regex.search(segment)
+        nickname = normalize_nickname(match.group(1) if match else None)
+        if nickname:
+            return nickname
+    return None
+
+
+def _hatched_nickname_for(title: Optional[str], body: Optional[str]) -> Optional[str]:
+    """Try body, title, then title and body together, like the Node matcher."""
+    candidates = (body, title, f"{title}\n{body}" if title and body else None)
+    for candidate in candidates:
+        nickname = extract_hatched_nickname(candidate)
+        if nickname:
+            return nickname
+    return None
+
+
+@dataclass(frozen=True, slots=True)
 class NotificationRecord:
     timestamp: Optional[str]
     title: Optional[str]
     body: Optional[str]
     app: Optional[str]
+    notification_id: Optional[int] = None
+    fingerprint: str = field(default="", compare=False)
+    seq: int = field(default=0, compare=False)
+    hatched_nickname: Optional[str] = field(default=None, compare=False)
+    signature: str = field(default="", compare=False)
+
+    def __post_init__(self) -> None:
+        if not self.fingerprint:
+            object.__setattr__(
+                self,
+                "fingerprint",
+                _content_fingerprint(self.timestamp, self.app, self.title, self.body),
+            )
+        if not self.signature:
+            object.__setattr__(
+                self,
+                "signature",
+                _forward_signature(self.timestamp, self.app, self.title, self.body),
+            )
 
     def to_json(self) -> Dict[str, Optional[str]]:
         return {
@@ -43,17 +215,1137 @@ class NotificationRecord:
             "title": self.title,
             "body": self.body,
             "app": self.app,
+            "notificationId": self.notification_id,
+            "seq": self.seq,
+            "hatchedNickname": self.hatched_nickname,
+            "signature": self.signature,
+        }
+
+    @classmethod
+    def from_json(cls, payload: Dict[str, object]) -> "NotificationRecord":
+        return cls(
+            timestamp=payload.get("timestamp"),
+            title=payload.get("title"),
+            body=payload.get("body"),
+            app=payload.get("app"),
+            notification_id=payload.get("notificationId"),
+            seq=int(payload.get("seq") or 0),
+            hatched_nickname=(
+                payload["hatchedNickname"]
+                if "hatchedNickname" in payload
+                else _hatched_nickname_for(payload.get("title"), payload.get("body"))
+            ),
+        )
+
+
+def _init_winrt_apartment() -> None:
+    """Best-effort multithreaded COM apartment init for the current thread."""
+    for module_name in ("winrt.runtime", "winrt"):
+        try:
+            module = importlib.import_module(module_name)
+        except Exception:
+            continue
+        init_apartment = getattr(module, "init_apartment", None)
+        if not callable(init_apartment):
+            continue
+        apartment_type = getattr(module, "MTA", None)
+        if apartment_type is None:
+            apartment_type = getattr(
+                getattr(module, "ApartmentType", None), "MULTI_THREADED", None
+            )
+        try:
+            if apartment_type is None:
+                init_apartment()
+            else:
+                init_apartment(apartment_type)
+            LOGGER.info("Initialized WinRT apartment on worker thread via %s.", module_name)
+        except Exception as error:
+            LOGGER.debug("WinRT apartment init via %s skipped: %s", module_name, error)
+        return
+
+
+class WinRtWorker:
+    """Dedicated thread with its own event loop for WinRT fetching and mapping.
+
+    COM attribute access is slow and synchronous; running it here keeps the
+    IPC event loop responsive while large snapshots are being mapped.
+    """
+
+    def __init__(self, name: str = "winrt-worker") -> None:
+        self.name = name
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._queue_depth = 0
+        self._max_queue_depth = 0
+        self._completed = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self) -> None:
+        _init_winrt_apartment()
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    async def run(self, function: Callable, *args):
+        """Run ``function(*args)`` (sync or async) on the worker and await its result."""
+        self.start()
+        with self._stats_lock:
+            self._queue_depth += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queue_depth)
+
+        async def invoke():
+            try:
+                result = function(*args)
+                if inspect.isawaitable(result):
+                    result = await result
+                return result
+            finally:
+                with self._stats_lock:
+                    self._queue_depth -= 1
+                    self._completed += 1
+
+        future = asyncio.run_coroutine_threadsafe(invoke(), self._loop)
+        return await asyncio.wrap_future(future)
+
+    def queue_depth(self) -> int:
+        return self._queue_depth
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {
+                "queueDepth": self._queue_depth,
+                "maxQueueDepth": self._max_queue_depth,
+                "completed": self._completed,
+            }
+
+    def stop(self) -> None:
+        thread, loop = self._thread, self._loop
+        self._thread = None
+        self._loop = None
+        if thread is None or loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+
+class RefreshScheduler:
+    """Single-flight refresh runner that coalesces bursts of change events.
+
+    ``request()`` never starts a second refresh while one is running; any number
+    of requests arriving during the coalescing window or an in-flight refresh
+    collapse into at most one follow-up refresh.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[], Awaitable[object]],
+        coalesce_window_seconds: float = 0.05,
+    ) -> None:
+        self._refresh = refresh
+        self.coalesce_window_seconds = coalesce_window_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._pending = False
+        self.requested = 0
+        self.executed = 0
+        self.coalesced = 0
+
+    def request(self) -> None:
+        self.requested += 1
+        if self._pending:
+            self.coalesced += 1
+            return
+        self._pending = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._pending:
+            if self.coalesce_window_seconds > 0:
+                await asyncio.sleep(self.coalesce_window_seconds)
+            self._pending = False
+            self.executed += 1
+            try:
+                await self._refresh()
+            except Exception:
+                LOGGER.exception("Scheduled notification refresh failed")
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requested": self.requested,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
+
+    async def close(self) -> None:
+        task = self._task
+        self._task = None
+        self._pending = False
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+class AdaptivePollInterval:
+    """Fallback poll interval that tightens on changes and backs off when idle.
+
+    A changed snapshot (hit) snaps the interval to ``floor_seconds``; an
+    unchanged one (miss) multiplies it by ``backoff_factor`` up to
+    ``ceiling_seconds``. ``reset()`` returns to the base interval.
+    """
+
+    def __init__(
+        self,
+        base_seconds: float = 1.5,
+        floor_seconds: float = 0.25,
+        ceiling_seconds: float = 10.0,
+        backoff_factor: float = 2.0,
+    ) -> None:
+        self.floor_seconds = floor_seconds
+        self.ceiling_seconds = ceiling_seconds
+        self.backoff_factor = backoff_factor
+        self.base_seconds = base_seconds
+        self.current_seconds = base_seconds
+        self.hits = 0
+        self.misses = 0
+        self.resets = 0
+
+    def restart(self, base_seconds: float) -> None:
+        self.base_seconds = base_seconds
+        self.floor_seconds = min(self.floor_seconds, base_seconds)
+        self.ceiling_seconds = max(self.ceiling_seconds, base_seconds)
+        self.current_seconds = base_seconds
+
+    def record_hit(self) -> None:
+        self.hits += 1
+        self.current_seconds = self.floor_seconds
+
+    def record_miss(self) -> None:
+        self.misses += 1
+        self.current_seconds = min(
+            self.current_seconds * self.backoff_factor, self.ceiling_seconds
+        )
+
+    def reset(self) -> None:
+        self.resets += 1
+        self.current_seconds = self.base_seconds
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "intervalSeconds": self.current_seconds,
+            "floorSeconds": self.floor_seconds,
+            "ceilingSeconds": self.ceiling_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "resets": self.resets,
+        }
+
+
+class Histogram:
+    """Log-linear (HDR-style) histogram of non-negative integer values.
+
+    Values below ``2 ** sub_bucket_bits`` are counted exactly; above that each
+    power of two is split into ``2 ** (sub_bucket_bits - 1)`` buckets. With 6
+    bits that is 32 buckets, so a reported percentile (the bucket's upper
+    bound) is at most 1/32, about 3%, above the recorded value while the memory
+    stays bounded. Safe to record into from any thread.
+    """
+
+    SUB_BUCKET_BITS = 6
+
+    def __init__(self, unit: str = "us") -> None:
+        self.unit = unit
+        self._counts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    @classmethod
+    def _bucket(cls, value: int) -> int:
+        if value < 1 << cls.SUB_BUCKET_BITS:
+            return value
+        shift = value.bit_length() - cls.SUB_BUCKET_BITS
+        return (shift << (cls.SUB_BUCKET_BITS - 1)) + (value >> shift)
+
+    @classmethod
+    def _bucket_high(cls, bucket: int) -> int:
+        """Largest value counted in ``bucket``."""
+        if bucket < 1 << cls.SUB_BUCKET_BITS:
+            return bucket
+        half = 1 << (cls.SUB_BUCKET_BITS - 1)
+        shift = bucket // half - 1
+        return ((bucket - shift * half + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        value = max(int(value), 0)
+        bucket = self._bucket(value)
+        with self._lock:
+            self._counts[bucket] = self._counts.get(bucket, 0) + 1
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def record_seconds(self, seconds: float) -> None:
+        self.record(round(seconds * 1_000_000))
+
+    def percentiles(self, *quantiles: float) -> List[Optional[int]]:
+        with self._lock:
+            buckets = sorted(self._counts.items())
+            count, maximum = self.count, self.max
+        results: List[Optional[int]] = []
+        for quantile in quantiles:
+            if not count:
+                results.append(None)
+                continue
+            rank = max(1, int(quantile * count + 0.999999))
+            seen = 0
+            for bucket, bucket_count in buckets:
+                seen += bucket_count
+                if seen >= rank:
+                    results.append(min(self._bucket_high(bucket), maximum))
+                    break
+        return results
+
+    def stats(self) -> Dict[str, object]:
+        p50, p90, p99, p999 = self.percentiles(0.5, 0.9, 0.99, 0.999)
+        return {
+            "unit": self.unit,
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": round(self.total / self.count, 1) if self.count else None,
+            "p50": p50,
+            "p90": p90,
+            "p99": p99,
+            "p999": p999,
+        }
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: Histogram) -> None:
+        self._histogram = histogram
+
+    def __enter__(self) -> "_Span":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self._histogram.record_seconds(time.perf_counter() - self._started)
+        return False
+
+
+PROFILE_MODES = ("cprofile", "sample")
+MAX_PROFILE_WINDOW_SECONDS = 300.0
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.005
+# cProfile profiles every thread (via sys.monitoring) from Python 3.12 on.
+PROFILER_COVERS_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+class PhaseProfiler:
+    """Per-phase timing spans and on-demand profiling windows (``--profile``).
+
+    While disabled, ``span()`` returns one shared no-op context manager, so
+    instrumented code only pays for a call and an attribute check. A window
+    runs cProfile on both the IPC loop and the WinRT worker thread, or samples
+    every thread's stack, for a bounded time and writes the result, plus the
+    span histograms, to ``output_dir``.
+    """
+
+    def __init__(self, enabled: bool = False, output_dir: str = ".") -> None:
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self._spans: Dict[str, Histogram] = {}
+        self._spans_lock = threading.Lock()
+        self._window: Optional[asyncio.Task] = None
+
+    def span(self, name: str):
+        if not self.enabled:
+            return _NO_SPAN
+        histogram = self._spans.get(name)
+        if histogram is None:
+            with self._spans_lock:
+                histogram = self._spans.setdefault(name, Histogram())
+        return _Span(histogram)
+
+    def span_stats(self) -> Dict[str, Dict[str, object]]:
+        with self._spans_lock:
+            spans = sorted(self._spans.items())
+        return {name: histogram.stats() for name, histogram in spans}
+
+    @property
+    def window_active(self) -> bool:
+        return self._window is not None and not self._window.done()
+
+    def start_window(
+        self,
+        seconds: float,
+        mode: str,
+        run_on_worker: Callable[..., Awaitable[object]],
+    ) -> str:
+        """Start a profiling window in the background; returns the output path."""
+        if not self.enabled:
+            raise RuntimeError("profiling is disabled; start the daemon with --profile")
+        if self.window_active:
+            raise RuntimeError("a profiling window is already running")
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"mode must be one of {', '.join(PROFILE_MODES)}")
+        if (
+            isinstance(seconds, bool)
+            or not isinstance(seconds, (int, float))
+            or not 0 < seconds <= MAX_PROFILE_WINDOW_SECONDS
+        ):
+            raise ValueError(f"seconds must be in (0, {MAX_PROFILE_WINDOW_SECONDS:g}]")
+        extension = "pstats" if mode == "cprofile" else "collapsed"
+        stamp = dt.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.output_dir, f"profile-{stamp}.{extension}")
+        self._window = asyncio.create_task(
+            self._run_window(float(seconds), mode, run_on_worker, path)
+        )
+        return path
+
+    async def wait_window(self) -> None:
+        if self._window is not None:
+            await self._window
+
+    async def _run_window(
+        self,
+        seconds: float,
+        mode: str,
+        run_on_worker: Callable[..., Awaitable[object]],
+        path: str,
+    ) -> None:
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            if mode == "cprofile":
+                await self._profile_with_cprofile(seconds, run_on_worker, path)
+            else:
+                await asyncio.to_thread(self._sample_stacks, seconds, path)
+            with open(f"{path}.spans.json", "w", encoding="utf-8") as handle:
+                json.dump(self.span_stats(), handle, indent=2)
+            LOGGER.info("Profile written to %s", path)
+        except Exception:
+            LOGGER.exception("Profiling window failed")
+
+    async def _profile_with_cprofile(
+        self,
+        seconds: float,
+        run_on_worker: Callable[..., Awaitable[object]],
+        path: str,
+    ) -> None:
+        # Before 3.12 cProfile only sees the thread that enabled it, so the
+        # WinRT worker gets its own profiler, enabled and disabled on that
+        # thread. Since 3.12 one profiler covers every thread and a second
+        # one cannot be enabled alongside it.
+        loop_profile = cProfile.Profile()
+        worker_profile = cProfile.Profile()
+        worker_enabled = False
+        loop_profile.enable()
+        try:
+            if not PROFILER_COVERS_ALL_THREADS:
+                await run_on_worker(worker_profile.enable)
+                worker_enabled = True
+            await asyncio.sleep(seconds)
+        finally:
+            loop_profile.disable()
+            if worker_enabled:
+                await run_on_worker(worker_profile.disable)
+        stats = pstats.Stats(loop_profile)
+        if worker_enabled:
+            stats.add(worker_profile)
+        stats.dump_stats(path)
+
+    @staticmethod
+    def _sample_stacks(seconds: float, path: str) -> None:
+        """Write sampled stacks of every other thread in collapsed (flame graph) format."""
+        own = threading.get_ident()
+        counts: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    location = f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}"
+                    stack.append(f"{code.co_name} ({location})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(PROFILE_SAMPLE_INTERVAL_SECONDS)
+        with open(path, "w", encoding="utf-8") as handle:
+            for stack, count in counts.most_common():
+                handle.write(f"{stack} {count}\n")
+
+
+def _age_seconds(since: Optional[float]) -> Optional[float]:
+    return None if since is None else round(time.monotonic() - since, 3)
+
+
+def _encode_json(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+class NotificationSnapshot(Sequence):
+    """Published snapshot whose JSON payload is built and encoded at most once.
+
+    Behaves as a read-only sequence of notification dicts; ``_encode_frame``
+    splices ``encoded()`` into outgoing frames instead of re-serializing it.
+    """
+
+    __slots__ = (
+        "records",
+        "version",
+        "_payload",
+        "_encoded",
+        "_encoded_msgpack",
+        "_by_nickname",
+    )
+
+    def __init__(self, records=()) -> None:
+        self.records: Tuple[NotificationRecord, ...] = tuple(records)
+        self.version = _snapshot_fingerprint(self.records)
+        self._payload: Optional[List[Dict[str, Optional[str]]]] = None
+        self._encoded: Optional[bytes] = None
+        self._encoded_msgpack: Optional[bytes] = None
+        self._by_nickname: Optional[Dict[str, List[int]]] = None
+
+    def positions_by_nickname(self) -> Dict[str, List[int]]:
+        """Index from extracted "hatched" nickname to record positions."""
+        if self._by_nickname is None:
+            index: Dict[str, List[int]] = {}
+            for position, record in enumerate(self.records):
+                if record.hatched_nickname:
+                    index.setdefault(record.hatched_nickname, []).append(position)
+            self._by_nickname = index
+        return self._by_nickname
+
+    def roster_matches(self, roster) -> List[Dict[str, Optional[str]]]:
+        """Payloads whose nickname is in ``roster``, in snapshot order."""
+        index = self.positions_by_nickname()
+        if len(roster) < len(index):
+            nicknames = [nickname for nickname in roster if nickname in index]
+        else:
+            nicknames = [nickname for nickname in index if nickname in roster]
+        positions = sorted(
+            position for nickname in nicknames for position in index[nickname]
+        )
+        payload = self.payload()
+        return [payload[position] for position in positions]
+
+    def payload(self) -> List[Dict[str, Optional[str]]]:
+        if self._payload is None:
+            self._payload = [record.to_json() for record in self.records]
+        return self._payload
+
+    def encoded(self) -> bytes:
+        if self._encoded is None:
+            self._encoded = _encode_json(self.payload())
+        return self._encoded
+
+    def encoded_msgpack(self) -> bytes:
+        if self._encoded_msgpack is None:
+            self._encoded_msgpack = msgpack.packb(self.payload(), use_bin_type=True)
+        return self._encoded_msgpack
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.payload()[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, NotificationSnapshot):
+            return self.version == other.version
+        if isinstance(other, list):
+            return self.payload() == other
+        return NotImplemented
+
+    __hash__ = None
+
+
+def _encode_frame(payload: Dict[str, object]) -> bytes:
+    """Encode one NDJSON frame, splicing pre-encoded snapshots in verbatim."""
+    spliced = {
+        key: value
+        for key, value in payload.items()
+        if isinstance(value, NotificationSnapshot)
+    }
+    if not spliced:
+        return _encode_json(payload) + b"\n"
+
+    head = _encode_json(
+        {key: value for key, value in payload.items() if key not in spliced}
+    )
+    parts = [head[:-1]]
+    needs_separator = head != b"{}"
+    for key, snapshot in spliced.items():
+        if needs_separator:
+            parts.append(b",")
+        needs_separator = True
+        parts.append(_encode_json(key) + b":" + snapshot.encoded())
+    parts.append(b"}\n")
+    return b"".join(parts)
+
+
+def _encode_msgpack_frame(payload: Dict[str, object]) -> bytes:
+    """Encode one MessagePack map, splicing pre-encoded snapshots in verbatim."""
+    packer = msgpack.Packer(use_bin_type=True, autoreset=True)
+    parts = [packer.pack_map_header(len(payload))]
+    for key, value in payload.items():
+        parts.append(packer.pack(key))
+        if isinstance(value, NotificationSnapshot):
+            parts.append(value.encoded_msgpack())
+        else:
+            parts.append(packer.pack(value))
+    return b"".join(parts)
+
+
+PROTOCOL_VERSION = 2
+FRAMINGS = ("ndjson", "length-prefixed")
+FRAME_HEADER = struct.Struct(">IB")
+FRAME_FLAG_MSGPACK = 0x01
+FRAME_FLAG_ZLIB = 0x02
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+COMPRESSIONS = ("none", "zlib")
+# Preset deflate dictionary of recurring frame keys and toast text. zlib
+# matches closer entries more cheaply, so the most common strings come last.
+COMPRESSION_DICTIONARY = "".join(
+    (
+        "Roblox Pet Simulator Huge Titanic Rainbow Golden Shiny Secret Hatcher ",
+        "Unknown app Discord Microsoft Edge Google Chrome ",
+        "with bonus roll Congrats! :flag_cz: :flag_us: :flag_de: :flag_gb: ",
+        '"ok":true,"errorCode":null,"message":null,"pushActive":true,',
+        '{"type":"notification_records","records":[',
+        '{"type":"notifications_delta","seq":,"baseSeq":,"version":"","added":[',
+        '],"removed":[',
+        '{"type":"notifications","seq":,"version":"","notifications":[',
+        '{"type":"notification","timestamp":"T:00:00.000000Z","title":"',
+        '","body":null,"app":"',
+        '","notificationId":,"seq":,"hatchedNickname":null,"signature":"',
+        ' hatched a Huge ',
+        '"},{"type":"notification","timestamp":"',
+    )
+).encode("utf-8")
+
+
+class CompressionStats:
+    """Aggregate cost and benefit of frame compression across connections."""
+
+    __slots__ = ("compressed_frames", "skipped_frames", "bytes_in", "bytes_out", "cpu_seconds")
+
+    def __init__(self) -> None:
+        self.compressed_frames = 0
+        self.skipped_frames = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "compressedFrames": self.compressed_frames,
+            "skippedFrames": self.skipped_frames,
+            "bytesIn": self.bytes_in,
+            "bytesOut": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+            "cpuMs": round(self.cpu_seconds * 1000.0, 3),
+        }
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    return ("json", "msgpack") if msgpack is not None else ("json",)
+
+
+class FrameCodec:
+    """Wire format of one connection, negotiated with the ``hello`` request.
+
+    ``ndjson`` frames are UTF-8 JSON terminated by ``\\n`` (the default).
+    ``length-prefixed`` frames start with a ``>IB`` header (payload length,
+    flags) followed by the payload; flag bit 0 marks a MessagePack payload,
+    otherwise it is UTF-8 JSON. With ``zlib`` compression, payloads of at
+    least ``compression_threshold`` bytes are deflated independently with
+    ``COMPRESSION_DICTIONARY`` and flagged with bit 1, so compressed frames can
+    still be shared between connections. Incoming frames are decoded by their
+    own flags.
+    """
+
+    __slots__ = (
+        "framing",
+        "encoding",
+        "compression",
+        "compression_threshold",
+        "compression_level",
+        "compression_stats",
+        "key",
+    )
+
+    def __init__(
+        self,
+        framing: str = "ndjson",
+        encoding: str = "json",
+        compression: str = "none",
+        compression_threshold: int = 1024,
+        compression_level: int = 6,
+        compression_stats: Optional[CompressionStats] = None,
+    ) -> None:
+        self.framing = framing
+        self.encoding = encoding
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+        self.compression_stats = compression_stats or CompressionStats()
+        self.key = f"{framing}/{encoding}"
+        if compression != "none":
+            self.key += f"/{compression}:{compression_level}:{compression_threshold}"
+
+    @property
+    def length_prefixed(self) -> bool:
+        return self.framing == "length-prefixed"
+
+    def encode(self, payload: Dict[str, object], ndjson: Optional[bytes] = None) -> bytes:
+        """Encode ``payload``; ``ndjson`` is an already encoded NDJSON frame to reuse."""
+        if not self.length_prefixed:
+            return ndjson if ndjson is not None else _encode_frame(payload)
+        if self.encoding == "msgpack":
+            data = _encode_msgpack_frame(payload)
+            flags = FRAME_FLAG_MSGPACK
+        else:
+            if ndjson is None:
+                ndjson = _encode_frame(payload)
+            data = ndjson[:-1]
+            flags = 0
+        if self.compression == "zlib":
+            data, flags = self._compress(data, flags)
+        return FRAME_HEADER.pack(len(data), flags) + data
+
+    def _compress(self, data: bytes, flags: int) -> Tuple[bytes, int]:
+        stats = self.compression_stats
+        if len(data) < self.compression_threshold:
+            stats.skipped_frames += 1
+            return data, flags
+        started = time.thread_time()
+        compressor = zlib.compressobj(
+            self.compression_level,
+            zlib.DEFLATED,
+            15,
+            8,
+            zlib.Z_DEFAULT_STRATEGY,
+            COMPRESSION_DICTIONARY,
+        )
+        compressed = compressor.compress(data) + compressor.flush()
+        stats.cpu_seconds += time.thread_time() - started
+        if len(compressed) >= len(data):
+            stats.skipped_frames += 1
+            return data, flags
+        stats.compressed_frames += 1
+        stats.bytes_in += len(data)
+        stats.bytes_out += len(compressed)
+        return compressed, flags | FRAME_FLAG_ZLIB
+
+    async def read(self, reader: asyncio.StreamReader) -> Optional[Tuple[bytes, int]]:
+        """Read one request frame as ``(payload, flags)``; ``None`` at end of stream."""
+        if not self.length_prefixed:
+            line = await reader.readline()
+            return (line, 0) if line else None
+        try:
+            header = await reader.readexactly(FRAME_HEADER.size)
+        except asyncio.IncompleteReadError as error:
+            if not error.partial:
+                return None
+            raise
+        length, flags = FRAME_HEADER.unpack(header)
+        if length > MAX_FRAME_BYTES:
+            raise ValueError(f"frame of {length} bytes exceeds {MAX_FRAME_BYTES}")
+        return await reader.readexactly(length), flags
+
+    @staticmethod
+    def decode(raw: bytes, flags: int = 0) -> Dict[str, object]:
+        if flags & FRAME_FLAG_ZLIB:
+            decompressor = zlib.decompressobj(zdict=COMPRESSION_DICTIONARY)
+            raw = decompressor.decompress(raw, MAX_FRAME_BYTES)
+            if decompressor.unconsumed_tail:
+                raise ValueError(f"decompressed frame exceeds {MAX_FRAME_BYTES} bytes")
+        if flags & FRAME_FLAG_MSGPACK:
+            if msgpack is None:
+                raise ValueError("MessagePack frames are not supported by this daemon")
+            return msgpack.unpackb(raw, raw=False)
+        return json.loads(raw.decode("utf-8"))
+
+
+NDJSON_CODEC = FrameCodec()
+
+
+class _OutboundFrame:
+    """One outgoing frame, encoded at most once per wire format."""
+
+    __slots__ = ("payload", "_encoded")
+
+    def __init__(self, payload: Dict[str, object]) -> None:
+        self.payload = payload
+        self._encoded: Dict[str, bytes] = {}
+
+    def encode(self, codec: FrameCodec) -> bytes:
+        data = self._encoded.get(codec.key)
+        if data is None:
+            ndjson = None
+            if codec is not NDJSON_CODEC and codec.encoding == "json":
+                ndjson = self.encode(NDJSON_CODEC)
+            data = codec.encode(self.payload, ndjson)
+            self._encoded[codec.key] = data
+        return data
+
+
+class NotificationJournal:
+    """Append-only, memory-mapped, segment-rotated log of mapped notifications.
+
+    Each entry is a ``>II`` header (payload length, CRC32) followed by the
+    record's UTF-8 JSON, including its ``seq``. Segment files are preallocated
+    to ``segment_bytes`` and mapped into memory; a zero length (or a checksum
+    mismatch left by a torn write) marks the end of a segment's data. When an
+    entry does not fit, a new segment named after its first ``seq`` is started
+    and segments beyond ``max_segments`` are deleted.
+
+    ``append()`` only buffers the entry; ``flush()`` copies buffered entries
+    into the mapping and msyncs it, so the caller controls the fsync cadence.
+    """
+
+    _HEADER = struct.Struct(">II")
+    _PREFIX = "journal-"
+    _SUFFIX = ".seg"
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 4 * 1024 * 1024,
+        max_segments: int = 8,
+    ) -> None:
+        self.directory = directory
+        self.segment_bytes = max(segment_bytes, 4096)
+        self.max_segments = max(max_segments, 1)
+        self.last_seq = 0
+        # ``_lock`` guards the pending buffer (appends come from the WinRT
+        # worker); ``_io_lock`` serializes access to the active mapping.
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._pending: List[Tuple[int, bytes]] = []
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._segment_path: Optional[str] = None
+        self._offset = 0
+        # Kept up to date on open and rotation so ``stats()`` never touches
+        # the filesystem (it is read on the event loop by metrics scrapes).
+        self._segment_count = 0
+        self._appended = 0
+        self._flushes = 0
+        self._flushed_bytes = 0
+        self._rotations = 0
+
+    def open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self._segment_paths()
+        for path in reversed(segments):
+            entries = self._read_segment(path)
+            if entries:
+                self.last_seq = int(entries[-1].get("seq") or 0)
+                break
+        if segments:
+            with self._io_lock:
+                self._map_segment(segments[-1])
+        self._segment_count = len(segments)
+        LOGGER.info(
+            "Notification journal opened at %s: %d segments, last seq %d",
+            self.directory,
+            len(segments),
+            self.last_seq,
+        )
+
+    def _segment_paths(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [
+            os.path.join(self.directory, name)
+            for name in sorted(names)
+            if name.startswith(self._PREFIX) and name.endswith(self._SUFFIX)
+        ]
+
+    @classmethod
+    def _scan(cls, buffer) -> Tuple[List[Dict[str, object]], int]:
+        """Decode entries from the start of ``buffer``; returns them and the end offset."""
+        entries: List[Dict[str, object]] = []
+        header_size = cls._HEADER.size
+        size = len(buffer)
+        offset = 0
+        while offset + header_size <= size:
+            length, checksum = cls._HEADER.unpack_from(buffer, offset)
+            start = offset + header_size
+            if length == 0 or start + length > size:
+                break
+            data = bytes(buffer[start : start + length])
+            if zlib.crc32(data) != checksum:
+                break
+            try:
+                entries.append(json.loads(data))
+            except ValueError:
+                break
+            offset = start + length
+        return entries, offset
+
+    def _read_segment(self, path: str) -> List[Dict[str, object]]:
+        with self._io_lock:
+            if path == self._segment_path and self._mmap is not None:
+                return self._scan(self._mmap[: self._offset])[0]
+        try:
+            with open(path, "rb") as segment_file:
+                data = segment_file.read()
+        except OSError as error:
+            LOGGER.warning("Unable to read journal segment %s: %s", path, error)
+            return []
+        return self._scan(data)[0]
+
+    def _map_segment(self, path: str, size: Optional[int] = None) -> None:
+        if size is None:
+            segment_file = open(path, "r+b")
+            size = os.path.getsize(path)
+            if size < self._HEADER.size:
+                size = self.segment_bytes
+                segment_file.truncate(size)
+        else:
+            segment_file = open(path, "w+b")
+            segment_file.truncate(size)
+        mapping = mmap.mmap(segment_file.fileno(), size)
+        _, offset = self._scan(mapping)
+        if any(mapping[offset : offset + self._HEADER.size]):
+            # Clear a torn tail so later appends never run into stale bytes.
+            mapping[offset:] = bytes(size - offset)
+        self._file = segment_file
+        self._mmap = mapping
+        self._segment_path = path
+        self._offset = offset
+
+    def _close_segment(self) -> None:
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap.close()
+        if self._file is not None:
+            self._file.close()
+        self._mmap = None
+        self._file = None
+        self._segment_path = None
+        self._offset = 0
+
+    def _rotate(self, first_seq: int, entry_size: int) -> None:
+        self._close_segment()
+        path = os.path.join(
+            self.directory, f"{self._PREFIX}{first_seq:020d}{self._SUFFIX}"
+        )
+        self._map_segment(
+            path, size=max(self.segment_bytes, entry_size + self._HEADER.size)
+        )
+        self._rotations += 1
+        segments = self._segment_paths()
+        self._segment_count = len(segments)
+        for stale_path in segments[: -self.max_segments]:
+            try:
+                os.remove(stale_path)
+            except OSError as error:
+                LOGGER.warning("Unable to delete journal segment %s: %s", stale_path, error)
+            else:
+                self._segment_count -= 1
+
+    def append(self, payload: Dict[str, object]) -> None:
+        """Buffer one record payload; it is written by the next ``flush()``."""
+        seq = int(payload.get("seq") or 0)
+        data = _encode_json(payload)
+        entry = self._HEADER.pack(len(data), zlib.crc32(data)) + data
+        with self._lock:
+            self._pending.append((seq, entry))
+            self.last_seq = max(self.last_seq, seq)
+            self._appended += 1
+
+    def flush(self) -> int:
+        """Write buffered entries into the mapped segment and msync it."""
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            written = 0
+            for seq, entry in pending:
+                if self._mmap is None or self._offset + len(entry) > len(self._mmap):
+                    self._rotate(seq, len(entry))
+                self._mmap[self._offset : self._offset + len(entry)] = entry
+                self._offset += len(entry)
+                written += len(entry)
+            self._mmap.flush()
+            self._flushes += 1
+            self._flushed_bytes += written
+            return len(pending)
+
+    def _segment_first_seq(self, path: str) -> int:
+        name = os.path.basename(path)[len(self._PREFIX) : -len(self._SUFFIX)]
+        try:
+            return int(name)
+        except ValueError:
+            return 0
+
+    def read_since(
+        self, after_seq: int
+    ) -> Tuple[List[Dict[str, object]], Optional[int]]:
+        """Return every retained entry with ``seq`` greater than ``after_seq``,
+        oldest first, and the first ``seq`` still retained (``None`` when the
+        journal is empty)."""
+        self.flush()
+        segments = self._segment_paths()
+        oldest_seq = self._segment_first_seq(segments[0]) if segments else None
+        start = 0
+        for index, path in enumerate(segments):
+            if self._segment_first_seq(path) > after_seq + 1:
+                break
+            start = index
+        entries: List[Dict[str, object]] = []
+        for path in segments[start:]:
+            entries.extend(
+                entry
+                for entry in self._read_segment(path)
+                if int(entry.get("seq") or 0) > after_seq
+            )
+        return entries, oldest_seq
+
+    def tail(self, limit: int) -> List[Dict[str, object]]:
+        """Return up to ``limit`` most recent entries, oldest first."""
+        if limit <= 0:
+            return []
+        self.flush()
+        collected: List[List[Dict[str, object]]] = []
+        count = 0
+        for path in reversed(self._segment_paths()):
+            entries = self._read_segment(path)
+            collected.append(entries)
+            count += len(entries)
+            if count >= limit:
+                break
+        merged = [entry for entries in reversed(collected) for entry in entries]
+        return merged[-limit:]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "segments": self._segment_count,
+            "lastSeq": self.last_seq,
+            "appended": self._appended,
+            "pending": pending,
+            "flushes": self._flushes,
+            "flushedBytes": self._flushed_bytes,
+            "rotations": self._rotations,
         }
 
+    def close(self) -> None:
+        self.flush()
+        with self._io_lock:
+            self._close_segment()
+
 
 class NotificationCollector:
     """Event-driven collector that stores latest toast snapshot."""
 
-    def __init__(self, loop: asyncio.AbstractEventLoop, max_cache: int = 200) -> None:
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        max_cache: int = 200,
+        coalesce_window_seconds: float = 0.05,
+        poll_floor_seconds: float = 0.25,
+        poll_ceiling_seconds: float = 10.0,
+        journal: Optional[NotificationJournal] = None,
+        journal_flush_interval_seconds: float = 1.0,
+        poll_interval_seconds: float = 1.5,
+        profiler: Optional[PhaseProfiler] = None,
+    ) -> None:
         self.loop = loop
+        self.profiler = profiler or PhaseProfiler()
         self.max_cache = max_cache
-        self._cache: List[NotificationRecord] = []
-        self._lock = threading.Lock()
+        self._refresh_scheduler = RefreshScheduler(
+            self._run_scheduled_refresh,
+            coalesce_window_seconds=coalesce_window_seconds,
+        )
+        # Targeted changes collected within one scheduler window, keyed by
+        # notification id (the latest change kind wins).
+        self._pending_changes: Dict[int, str] = {}
+        self._full_refresh_pending = False
+        self._snapshot = NotificationSnapshot()
+        # Owned by the WinRT worker thread; only touched from code it runs.
+        self._records_by_id: Dict[int, NotificationRecord] = {}
+        # ``(notification id, fingerprint) -> seq`` for records currently
+        # known; also owned by the worker thread once the collector started.
+        self._known_seqs: Dict[Tuple[Optional[int], str], int] = {}
+        self._next_seq = 1
+        self._journal = journal
+        self._journal_flush_interval_seconds = max(journal_flush_interval_seconds, 0.01)
+        self._journal_flush_task: Optional[asyncio.Task] = None
+        self._serving_journal_snapshot = False
+        self._worker = WinRtWorker()
+        self._publish_lock = asyncio.Lock()
+        self._refresh_timings = {
+            "fetch": Histogram(),
+            "map": Histogram(),
+            "serialize": Histogram(),
+            "total": Histogram(),
+        }
+        self._snapshot_items = Histogram(unit="items")
+        self._snapshot_published_at: Optional[float] = None
+        self._snapshot_changed_at: Optional[float] = None
+        # Full refreshes from polling, startup, change events and reads share
+        # one in-flight fetch, so an older fetch never publishes over a newer.
+        self._refresh_future: Optional[asyncio.Future] = None
+        self.refresh_completed_at: Optional[float] = None
+        self._change_event_stats = {
+            "received": 0,
+            "targetedAdded": 0,
+            "targetedRemoved": 0,
+            "fullRefreshFallbacks": 0,
+        }
         self._listener = None
         self._notification_changed_handler = None
         self._notification_changed_handler_source = None
@@ -63,17 +1355,108 @@ class NotificationCollector:
         self._available = False
         self._push_subscription_active = False
         self._poll_task: Optional[asyncio.Task] = None
-        self._poll_interval_seconds = 1.5
+        self._poll_interval_seconds = poll_interval_seconds
+        self._poll_interval = AdaptivePollInterval(
+            base_seconds=self._poll_interval_seconds,
+            floor_seconds=poll_floor_seconds,
+            ceiling_seconds=poll_ceiling_seconds,
+        )
+        self._poll_waiter: Optional[asyncio.Future] = None
         self._access_denied = False
         self._last_error = None
-        self._last_broadcast_payload: Optional[List[Dict[str, Optional[str]]]] = None
         self._snapshot_callback: Optional[
-            Callable[[List[Dict[str, Optional[str]]]], Optional[Awaitable[None]]]
+            Callable[[NotificationSnapshot, str], Optional[Awaitable[None]]]
         ] = None
 
+    @property
+    def _cache(self) -> Tuple[NotificationRecord, ...]:
+        return self._snapshot.records
+
+    @_cache.setter
+    def _cache(self, records) -> None:
+        self._snapshot = NotificationSnapshot(records)
+
+    async def open_journal(self) -> int:
+        """Open the journal, warm the cache from its tail and start periodic flushing.
+
+        Returns the number of records restored into the cache.
+        """
+        if self._journal is None:
+            return 0
+        await self.loop.run_in_executor(None, self._journal.open)
+        payloads = await self.loop.run_in_executor(
+            None, self._journal.tail, self.max_cache
+        )
+        records = [NotificationRecord.from_json(payload) for payload in payloads]
+        self._next_seq = self._journal.last_seq + 1
+        for record in records:
+            self._known_seqs[(record.notification_id, record.fingerprint)] = record.seq
+        if records:
+            self._cache = _newest_records(records, self.max_cache)
+            self._serving_journal_snapshot = True
+        self._journal_flush_task = asyncio.create_task(self._journal_flush_loop())
+        LOGGER.info(
+            "Warmed notification cache from journal: %d records (next seq %d)",
+            len(records),
+            self._next_seq,
+        )
+        return len(records)
+
+    async def _journal_flush_loop(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self._journal_flush_interval_seconds)
+                await self.loop.run_in_executor(None, self._journal.flush)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            LOGGER.exception("Notification journal flush loop crashed")
+
+    async def _close_journal(self) -> None:
+        if self._journal_flush_task is not None:
+            self._journal_flush_task.cancel()
+            try:
+                await self._journal_flush_task
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self._journal_flush_task = None
+        if self._journal is not None:
+            try:
+                self._journal.close()
+            except Exception:
+                LOGGER.exception("Failed to close notification journal")
+
+    def snapshot(self) -> NotificationSnapshot:
+        return self._snapshot
+
+    async def records_since(
+        self, after_seq: int
+    ) -> Tuple[List[Dict[str, object]], Optional[int]]:
+        """Record payloads with ``seq`` greater than ``after_seq``, oldest first,
+        and the oldest ``seq`` still available (``None`` when there is none).
+
+        Served from the journal when one is configured, otherwise from the
+        current snapshot.
+        """
+        if self._journal is not None:
+            return await self.loop.run_in_executor(
+                None, self._journal.read_since, after_seq
+            )
+        records = self._snapshot.records
+        oldest_seq = min((record.seq for record in records), default=None)
+        records = sorted(
+            (record for record in records if record.seq > after_seq),
+            key=lambda record: record.seq,
+        )
+        return [record.to_json() for record in records], oldest_seq
+
+    def journal_stats(self) -> Optional[Dict[str, int]]:
+        return self._journal.stats() if self._journal is not None else None
+
     def set_snapshot_callback(
         self,
-        callback: Callable[[List[Dict[str, Optional[str]]]], Optional[Awaitable[None]]],
+        callback: Callable[[NotificationSnapshot, str], Optional[Awaitable[None]]],
     ) -> None:
         self._snapshot_callback = callback
 
@@ -866,7 +2249,7 @@ class NotificationCollector:
                 self._notification_changed_handler = None
                 self._started = True
                 startup_succeeded = True
-                await self.refresh_snapshot()
+                await self._refresh_shared()
                 self._poll_task = asyncio.create_task(self._poll_loop())
                 LOGGER.info(
                     "Notification collector ready in fallback mode without push subscription."
@@ -879,13 +2262,14 @@ class NotificationCollector:
             LOGGER.info(
                 "Notification changed handler registered and active (strong reference retained)."
             )
-            await self.refresh_snapshot()
+            await self._refresh_shared()
             LOGGER.info("Notification collector ready.")
         except Exception as error:  # pragma: no cover - winrt runtime behavior
             self._available = False
             self._last_error = str(error)
             LOGGER.exception("Failed to initialize notification collector")
         finally:
+            self._serving_journal_snapshot = False
             if not startup_succeeded:
                 self._started = False
                 self._push_subscription_active = False
@@ -902,6 +2286,8 @@ class NotificationCollector:
 
     async def stop(self) -> None:
         if not self._started:
+            self._worker.stop()
+            await self._close_journal()
             return
 
         if self._poll_task is not None:
@@ -913,6 +2299,10 @@ class NotificationCollector:
             finally:
                 self._poll_task = None
 
+        await self._refresh_scheduler.close()
+        self._pending_changes.clear()
+        self._full_refresh_pending = False
+
         if self._listener and self._notification_changed_handler:
             try:
                 self._listener.remove_notification_changed(
@@ -926,15 +2316,46 @@ class NotificationCollector:
         self._listener = None
         self._started = False
         self._push_subscription_active = False
-        self._last_broadcast_payload = None
+        self._worker.stop()
+        self._records_by_id.clear()
+        self._known_seqs.clear()
+        await self._close_journal()
+
+    async def _wait_poll_interval(self) -> bool:
+        """Sleep for the current poll interval; returns True if woken by a read."""
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        timer = loop.call_later(
+            self._poll_interval.current_seconds,
+            lambda: waiter.done() or waiter.set_result(False),
+        )
+        self._poll_waiter = waiter
+        try:
+            return await waiter
+        finally:
+            timer.cancel()
+            self._poll_waiter = None
 
     async def _poll_loop(self) -> None:
+        self._poll_interval.restart(self._poll_interval_seconds)
         try:
             while self._started and not self._push_subscription_active:
-                await asyncio.sleep(self._poll_interval_seconds)
+                if await self._wait_poll_interval():
+                    # A read request just refreshed the snapshot and reset the
+                    # interval; start a fresh wait instead of polling now.
+                    continue
                 if not self._started:
                     break
-                await self.refresh_snapshot()
+                changed = await self._refresh_shared()
+                if changed:
+                    self._poll_interval.record_hit()
+                else:
+                    self._poll_interval.record_miss()
+                LOGGER.debug(
+                    "Fallback poll %s; next poll in %.2fs",
+                    "detected changes" if changed else "unchanged",
+                    self._poll_interval.current_seconds,
+                )
         except asyncio.CancelledError:
             raise
         except Exception:
@@ -943,6 +2364,90 @@ class NotificationCollector:
     def is_push_subscription_active(self) -> bool:
         return self._push_subscription_active
 
+    def note_read_request(self) -> None:
+        """Reset fallback polling to the base interval after a client read."""
+        if self._push_subscription_active:
+            return
+        self._poll_interval.reset()
+        if self._poll_waiter is not None and not self._poll_waiter.done():
+            self._poll_waiter.set_result(True)
+
+    def poll_stats(self) -> Dict[str, float]:
+        return self._poll_interval.stats()
+
+    def worker_stats(self) -> Dict[str, int]:
+        return self._worker.stats()
+
+    def refresh_stats(self) -> Dict[str, int]:
+        return self._refresh_scheduler.stats()
+
+    def change_event_stats(self) -> Dict[str, int]:
+        return dict(self._change_event_stats)
+
+    def metrics(self) -> Dict[str, object]:
+        """Counters and histograms reported by the ``stats`` request."""
+        return {
+            "available": self._available,
+            "pushSubscriptionActive": self._push_subscription_active,
+            "notificationKindSource": self._notification_kind_source,
+            "snapshotVersion": self._snapshot.version,
+            "snapshotLength": len(self._snapshot),
+            "snapshotAgeSeconds": _age_seconds(self._snapshot_published_at),
+            "snapshotChangedAgeSeconds": _age_seconds(self._snapshot_changed_at),
+            "snapshotItems": self._snapshot_items.stats(),
+            "refreshUs": {
+                phase: histogram.stats() for phase, histogram in self._refresh_timings.items()
+            },
+            "refreshScheduler": self.refresh_stats(),
+            "changeEvents": self.change_event_stats(),
+            "worker": self.worker_stats(),
+            "poll": self.poll_stats(),
+            "journal": self.journal_stats(),
+            "spansUs": self.profiler.span_stats() if self.profiler.enabled else None,
+        }
+
+    def start_profile_window(self, seconds: float, mode: str) -> str:
+        """Profile the IPC loop and WinRT worker for ``seconds``; see ``PhaseProfiler``."""
+        return self.profiler.start_window(seconds, mode, self._worker.run)
+
+    def tuning(self) -> Dict[str, float]:
+        return {
+            "maxCache": self.max_cache,
+            "pollIntervalMs": self._poll_interval_seconds * 1000.0,
+            "pollFloorMs": self._poll_interval.floor_seconds * 1000.0,
+            "pollCeilingMs": self._poll_interval.ceiling_seconds * 1000.0,
+            "refreshCoalesceMs": self._refresh_scheduler.coalesce_window_seconds * 1000.0,
+        }
+
+    async def apply_tuning(
+        self,
+        max_cache: Optional[int] = None,
+        poll_interval_seconds: Optional[float] = None,
+        poll_floor_seconds: Optional[float] = None,
+        poll_ceiling_seconds: Optional[float] = None,
+        coalesce_window_seconds: Optional[float] = None,
+    ) -> None:
+        """Change collector parameters live; ``None`` leaves a parameter as is."""
+        if coalesce_window_seconds is not None:
+            self._refresh_scheduler.coalesce_window_seconds = coalesce_window_seconds
+        interval = self._poll_interval
+        if poll_floor_seconds is not None:
+            interval.floor_seconds = poll_floor_seconds
+        if poll_ceiling_seconds is not None:
+            interval.ceiling_seconds = poll_ceiling_seconds
+        if poll_interval_seconds is not None:
+            self._poll_interval_seconds = poll_interval_seconds
+            interval.base_seconds = poll_interval_seconds
+        interval.current_seconds = min(
+            max(interval.current_seconds, interval.floor_seconds), interval.ceiling_seconds
+        )
+        if max_cache is not None and max_cache != self.max_cache:
+            shrinking = max_cache < self.max_cache
+            self.max_cache = max_cache
+            if shrinking:
+                # Trim now instead of waiting for the next refresh.
+                await self._publish_snapshot(list(self._snapshot.records))
+
     def _resolve_toast_notification_kind(self, notification_kinds_enum):
         """Resolve enum member name differences across WINRT binding variants."""
         candidate_names = ("TOAST", "Toast")
@@ -968,35 +2473,56 @@ class NotificationCollector:
         )
         return 1, "numeric-fallback"
 
-    async def refresh_snapshot(self) -> None:
+    def refresh_in_flight(self) -> Optional[asyncio.Future]:
+        """The shared full refresh currently running, if any."""
+        refresh = self._refresh_future
+        return refresh if refresh is not None and not refresh.done() else None
+
+    def shared_refresh(self) -> asyncio.Future:
+        """Return the in-flight full refresh, starting one if none is running.
+
+        Callers should await it through ``asyncio.shield`` so one caller going
+        away does not cancel the refresh for the others.
+        """
+        refresh = self.refresh_in_flight()
+        if refresh is None:
+            refresh = asyncio.ensure_future(self.refresh_snapshot())
+            refresh.add_done_callback(self._shared_refresh_done)
+            self._refresh_future = refresh
+        return refresh
+
+    def _shared_refresh_done(self, refresh: asyncio.Future) -> None:
+        if not refresh.cancelled() and refresh.exception() is None:
+            self.refresh_completed_at = time.monotonic()
+
+    async def _refresh_shared(self, fresh: bool = False):
+        """Run a full refresh through the shared in-flight future.
+
+        With ``fresh`` a refresh already in flight is awaited first and a new
+        one joined or started, so the fetch begins after the caller's trigger.
+        """
+        if fresh:
+            pending = self.refresh_in_flight()
+            if pending is not None:
+                await asyncio.gather(asyncio.shield(pending), return_exceptions=True)
+        return await asyncio.shield(self.shared_refresh())
+
+    async def refresh_snapshot(self) -> bool:
+        """Refresh the cached snapshot; returns whether the published snapshot changed.
+
+        Runs a fetch unconditionally; the daemon's own callers go through
+        ``shared_refresh`` so concurrent fetches never race to publish.
+        """
         if not self._listener:
-            return
+            return False
         if self._notification_kind_toast is None:
             LOGGER.error(
                 "Cannot refresh notifications because toast notification kind enum is unresolved."
             )
-            return
+            return False
         try:
-            try:
-                raw_notifications = await self._listener.get_notifications_async(
-                    self._notification_kind_toast
-                )
-            except (TypeError, ValueError):
-                if self._notification_kind_toast == 1:
-                    raise
-                LOGGER.warning(
-                    "get_notifications_async rejected enum toast kind; numeric fallback used for toast kind bit (1)."
-                )
-                self._notification_kind_toast = 1
-                self._notification_kind_source = "numeric-fallback"
-                raw_notifications = await self._listener.get_notifications_async(1)
-
-            LOGGER.info(
-                "Received notifications snapshot: %d items",
-                len(raw_notifications),
-            )
-            mapped = [self._map_notification(item) for item in raw_notifications]
-            LOGGER.info("Mapped notifications snapshot: %d items", len(mapped))
+            started = time.perf_counter()
+            mapped = await self._worker.run(self._fetch_and_map_snapshot, self._listener)
 
             if LOGGER.isEnabledFor(logging.DEBUG) and mapped:
                 debug_preview = []
@@ -1018,24 +2544,280 @@ class NotificationCollector:
                         "Notifications preview (up to 3 items): %s", debug_preview
                     )
 
-            cleaned = [item for item in mapped if item is not None]
-            cleaned.sort(key=lambda item: item.timestamp or "", reverse=True)
-            with self._lock:
-                self._cache = cleaned[: self.max_cache]
+            changed = await self._publish_snapshot(
+                [item for item in mapped if item is not None]
+            )
+            self._refresh_timings["total"].record_seconds(time.perf_counter() - started)
+            return changed
+        except Exception:
+            LOGGER.exception("Failed to refresh notification snapshot")
+            return False
+
+    async def _publish_snapshot(self, records: List[NotificationRecord]) -> bool:
+        """Store the newest ``max_cache`` unique records and notify the snapshot callback.
+
+        Records sharing a forward ``signature`` are collapsed to the first one,
+        so published snapshots are unique and ordered newest first.
+        Returns whether the snapshot differs from the previously published one.
+        """
+        unique: Dict[str, NotificationRecord] = {}
+        async with self._publish_lock:
+            with self.profiler.span("publish.dedupe_sort"):
+                for record in records:
+                    unique.setdefault(record.signature, record)
+                snapshot = NotificationSnapshot(
+                    _newest_records(list(unique.values()), self.max_cache)
+                )
+            self._snapshot_items.record(len(snapshot))
+            self._snapshot_published_at = time.monotonic()
+            if snapshot.version == self._snapshot.version:
+                # Keep the published instance so its cached encoding survives
+                # unchanged refreshes.
+                return False
+            # Snapshots are immutable; swapping the reference is atomic, so
+            # readers never need the lock.
+            self._snapshot = snapshot
+            self._snapshot_changed_at = self._snapshot_published_at
+
+            # Every reader and subscriber needs the JSON encoding; build it
+            # once here so its cost shows up in the refresh timings.
+            started = time.perf_counter()
+            with self.profiler.span("publish.json_encode"):
+                snapshot.encoded()
+            self._refresh_timings["serialize"].record_seconds(time.perf_counter() - started)
 
             if self._snapshot_callback:
-                payload = [item.to_json() for item in self._cache]
-                if payload == self._last_broadcast_payload:
-                    return
-                self._last_broadcast_payload = payload
-                callback_result = self._snapshot_callback(payload)
+                callback_result = self._snapshot_callback(snapshot, snapshot.version)
                 if asyncio.iscoroutine(callback_result):
                     await callback_result
+            return True
+
+    async def _fetch_and_map_snapshot(
+        self, listener
+    ) -> Tuple[Optional[NotificationRecord], ...]:
+        """Fetch and map the toast snapshot; runs on the WinRT worker thread."""
+        started = time.perf_counter()
+        try:
+            with self.profiler.span("fetch.get_notifications_async"):
+                raw_notifications = await listener.get_notifications_async(
+                    self._notification_kind_toast
+                )
+        except (TypeError, ValueError):
+            if self._notification_kind_toast == 1:
+                raise
+            LOGGER.warning(
+                "get_notifications_async rejected enum toast kind; numeric fallback used for toast kind bit (1)."
+            )
+            self._notification_kind_toast = 1
+            self._notification_kind_source = "numeric-fallback"
+            with self.profiler.span("fetch.get_notifications_async"):
+                raw_notifications = await listener.get_notifications_async(1)
+
+        fetched = time.perf_counter()
+        self._refresh_timings["fetch"].record_seconds(fetched - started)
+
+        LOGGER.info(
+            "Received notifications snapshot: %d items",
+            len(raw_notifications),
+        )
+        mapped = tuple(self._map_snapshot_incrementally(raw_notifications))
+        self._refresh_timings["map"].record_seconds(time.perf_counter() - fetched)
+        return mapped
+
+    def _notification_id(self, item) -> Optional[int]:
+        try:
+            notification_id = getattr(item, "id", None)
         except Exception:
-            LOGGER.exception("Failed to refresh notification snapshot")
+            return None
+        if isinstance(notification_id, bool) or not isinstance(notification_id, int):
+            return None
+        return notification_id
+
+    def _map_snapshot_incrementally(
+        self, raw_notifications
+    ) -> List[Optional[NotificationRecord]]:
+        """Map only notifications whose WinRT id has not been seen before.
+
+        Records are cached by ``UserNotification.id``; ids missing from the
+        latest snapshot are evicted. Items without a usable id are always mapped.
+        """
+        mapped: List[Optional[NotificationRecord]] = []
+        seen_ids: Set[int] = set()
+        known_seqs = self._known_seqs
+        self._known_seqs = {}
+        newly_mapped = 0
+        for item in raw_notifications:
+            notification_id = self._notification_id(item)
+            if notification_id is None:
+                record = self._map_notification(item)
+                newly_mapped += 1
+                if record is not None:
+                    record = self._assign_seq(record, known_seqs)
+                mapped.append(record)
+                continue
+
+            seen_ids.add(notification_id)
+            record = self._records_by_id.get(notification_id)
+            if record is None:
+                record = self._map_notification(item)
+                newly_mapped += 1
+                if record is not None:
+                    record = self._assign_seq(record, known_seqs)
+                    self._records_by_id[notification_id] = record
+            else:
+                self._known_seqs[(notification_id, record.fingerprint)] = record.seq
+            mapped.append(record)
+
+        stale_ids = [
+            notification_id
+            for notification_id in self._records_by_id
+            if notification_id not in seen_ids
+        ]
+        for notification_id in stale_ids:
+            del self._records_by_id[notification_id]
+
+        LOGGER.info(
+            "Mapped notifications snapshot: %d items (%d newly mapped, %d evicted)",
+            len(mapped),
+            newly_mapped,
+            len(stale_ids),
+        )
+        return mapped
+
+    def _assign_seq(
+        self,
+        record: NotificationRecord,
+        known_seqs: Optional[Dict[Tuple[Optional[int], str], int]] = None,
+    ) -> NotificationRecord:
+        """Give ``record`` its sequence number, journaling it the first time it is seen."""
+        key = (record.notification_id, record.fingerprint)
+        if known_seqs is None:
+            known_seqs = self._known_seqs
+        seq = known_seqs.get(key)
+        if seq is None:
+            seq = self._next_seq
+            self._next_seq += 1
+            record = replace(record, seq=seq)
+            if self._journal is not None:
+                self._journal.append(record.to_json())
+        elif record.seq != seq:
+            record = replace(record, seq=seq)
+        self._known_seqs[key] = seq
+        return record
+
+    def _parse_notification_change(self, args) -> Optional[Tuple[str, int]]:
+        """Extract ``(change kind, notification id)`` from changed-event args."""
+        if args is None:
+            return None
+        try:
+            notification_id = args.user_notification_id
+            change_kind = args.change_kind
+        except Exception:
+            return None
+        if isinstance(notification_id, bool) or not isinstance(notification_id, int):
+            return None
+
+        kind_name = str(getattr(change_kind, "name", change_kind)).strip().upper()
+        if kind_name in ("ADDED", "0"):
+            return "added", notification_id
+        if kind_name in ("REMOVED", "1"):
+            return "removed", notification_id
+        return None
 
-    def _on_notification_changed(self, _sender, _args) -> None:
-        self.loop.call_soon_threadsafe(asyncio.create_task, self.refresh_snapshot())
+    def _on_notification_changed(self, _sender, args) -> None:
+        # Invoked on a WinRT thread; event args are only read here and the
+        # actual work is handed to the event loop.
+        change = self._parse_notification_change(args)
+        if change is None:
+            self.loop.call_soon_threadsafe(self._request_full_refresh)
+            return
+        self.loop.call_soon_threadsafe(self._schedule_notification_change, *change)
+
+    def _request_full_refresh(self) -> None:
+        self._change_event_stats["received"] += 1
+        self._schedule_full_refresh()
+
+    def _schedule_full_refresh(self) -> None:
+        self._change_event_stats["fullRefreshFallbacks"] += 1
+        self._full_refresh_pending = True
+        self._refresh_scheduler.request()
+
+    def _schedule_notification_change(self, change_kind: str, notification_id: int) -> None:
+        self._change_event_stats["received"] += 1
+        self._pending_changes[notification_id] = change_kind
+        self._refresh_scheduler.request()
+
+    async def _run_scheduled_refresh(self) -> None:
+        """Run one scheduler batch: a full refresh when one was requested,
+        otherwise every targeted change collected during the window."""
+        changes = self._pending_changes
+        self._pending_changes = {}
+        if self._full_refresh_pending or not changes:
+            # A full fetch started now already reflects the pending changes.
+            self._full_refresh_pending = False
+            await self._refresh_shared(fresh=True)
+            return
+        await self._apply_notification_changes(changes)
+
+    async def _apply_notification_changes(self, changes: Dict[int, str]) -> None:
+        """Fetch or drop the changed notifications in one worker job and publish
+        once; fall back to a full refresh when any of them cannot be fetched."""
+        try:
+            listener = self._listener
+            if not listener:
+                changes = {
+                    notification_id: change_kind
+                    for notification_id, change_kind in changes.items()
+                    if change_kind == "removed"
+                }
+                if not changes:
+                    return
+            records, added, removed = await self._worker.run(
+                self._apply_changes_on_worker, listener, changes
+            )
+            if records is None:
+                return
+            self._change_event_stats["targetedAdded"] += added
+            self._change_event_stats["targetedRemoved"] += removed
+
+            unkeyed = [item for item in self._cache if item.notification_id is None]
+            await self._publish_snapshot(unkeyed + list(records))
+        except Exception as error:
+            LOGGER.info(
+                "Targeted handling for %d notification change(s) failed; "
+                "running full refresh: %s",
+                len(changes),
+                error,
+            )
+            self._schedule_full_refresh()
+
+    def _apply_changes_on_worker(
+        self, listener, changes: Dict[int, str]
+    ) -> Tuple[Optional[Tuple[NotificationRecord, ...]], int, int]:
+        """Update the id cache for a batch of changes. Returns the keyed
+        records (``None`` when nothing changed) with the added and removed
+        counts. Runs on the WinRT worker thread."""
+        added = 0
+        removed = 0
+        for notification_id, change_kind in changes.items():
+            if change_kind == "removed":
+                record = self._records_by_id.pop(notification_id, None)
+                if record is not None:
+                    self._known_seqs.pop((notification_id, record.fingerprint), None)
+                    removed += 1
+                continue
+
+            item = listener.get_notification(notification_id)
+            record = self._map_notification(item) if item is not None else None
+            if record is None:
+                raise LookupError(
+                    f"notification {notification_id} could not be fetched or mapped"
+                )
+            self._records_by_id[notification_id] = self._assign_seq(record)
+            added += 1
+        if not added and not removed:
+            return None, 0, 0
+        return tuple(self._records_by_id.values()), added, removed
 
     def _iter_visual_bindings(self, visual):
         get_bindings = getattr(visual, "get_bindings", None)
@@ -1088,23 +2870,28 @@ class NotificationCollector:
         return []
 
     def _map_notification(self, item) -> Optional[NotificationRecord]:
+        with self.profiler.span("map.notification"):
+            return self._map_notification_fields(item)
+
+    def _map_notification_fields(self, item) -> Optional[NotificationRecord]:
         try:
-            visual = item.notification.visual
-            bindings = self._iter_visual_bindings(visual)
-            if not bindings:
-                LOGGER.warning(
-                    "Skipping unsupported visual notification shape: %s",
-                    type(visual).__name__,
-                )
-            collected_texts: List[str] = []
+            with self.profiler.span("map.binding_probe"):
+                visual = item.notification.visual
+                bindings = self._iter_visual_bindings(visual)
+                if not bindings:
+                    LOGGER.warning(
+                        "Skipping unsupported visual notification shape: %s",
+                        type(visual).__name__,
+                    )
+                collected_texts: List[str] = []
 
-            for binding in bindings:
-                texts = self._iter_binding_texts(binding)
-                for text_item in texts:
-                    content = (getattr(text_item, "text", "") or "").strip()
-                    if not content:
-                        continue
-                    collected_texts.append(content)
+                for binding in bindings:
+                    texts = self._iter_binding_texts(binding)
+                    for text_item in texts:
+                        content = (getattr(text_item, "text", "") or "").strip()
+                        if not content:
+                            continue
+                        collected_texts.append(content)
 
             title = collected_texts[0] if len(collected_texts) >= 1 else None
             body_lines = collected_texts[1:] if len(collected_texts) >= 2 else []
@@ -1121,12 +2908,31 @@ class NotificationCollector:
             except Exception:
                 app = None
 
-            return NotificationRecord(timestamp=timestamp, title=title, body=body, app=app)
+            return NotificationRecord(
+                timestamp=timestamp,
+                title=title,
+                body=body,
+                app=app,
+                notification_id=self._notification_id(item),
+                hatched_nickname=_hatched_nickname_for(title, body),
+            )
         except Exception as error:
             LOGGER.warning("Unable to map notification: %s", error)
             return None
 
     def read(self) -> Dict[str, object]:
+        if self._serving_journal_snapshot:
+            # WinRT is still starting up; serve the journal-warmed snapshot.
+            snapshot = self._snapshot
+            return {
+                "ok": True,
+                "errorCode": None,
+                "message": None,
+                "version": snapshot.version,
+                "source": "journal",
+                "notifications": snapshot,
+            }
+
         if not self._available:
             return {
                 "ok": False,
@@ -1143,81 +2949,1058 @@ class NotificationCollector:
                 "notifications": [],
             }
 
-        with self._lock:
-            payload = [item.to_json() for item in self._cache]
-
+        snapshot = self._snapshot
         return {
             "ok": True,
             "errorCode": None,
             "message": None,
-            "notifications": payload,
+            "version": snapshot.version,
+            "notifications": snapshot,
+        }
+
+
+SUBSCRIPTION_MODES = ("full", "delta")
+REQUEST_TYPES = (
+    "ping",
+    "hello",
+    "read_notifications",
+    "subscribe_notifications",
+    "ack_notifications",
+    "set_nickname_roster",
+    "configure",
+    "stats",
+    "profile",
+)
+LOOP_LAG_SAMPLE_SECONDS = 0.25
+# Requests dispatched off a connection's read loop. Everything else (hello,
+# subscriptions, acks, roster updates) is handled in arrival order, because
+# later frames depend on its effects.
+CONCURRENT_REQUEST_TYPES = frozenset({"read_notifications"})
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "latest_snapshot", "disconnect")
+# Bytes a connection may have queued or unflushed before its read loop stops
+# accepting requests until the client catches up.
+CHANNEL_BACKLOG_BYTES = 1024 * 1024
+# How long a client that closed its side cleanly may take to receive the
+# replies still queued for it before the connection is dropped.
+CLOSE_FLUSH_TIMEOUT_SECONDS = 5.0
+
+
+class SubscriberChannel:
+    """Bounded outbound frame queue drained by a dedicated writer task.
+
+    Every write to a connection goes through its channel, so a slow consumer
+    only backs up its own queue. When more than ``max_queue`` push frames are
+    pending, ``policy`` decides what happens: ``drop_oldest`` discards the
+    oldest push frame, ``latest_snapshot`` replaces all pending push frames
+    with the latest full snapshot frame, and ``disconnect`` closes the
+    connection. Replies to requests are never dropped; instead the connection
+    stops reading requests while more than ``max_backlog_bytes`` are queued
+    or still sitting in the transport buffer (see ``wait_writable``).
+    """
+
+    def __init__(
+        self,
+        writer: asyncio.StreamWriter,
+        max_queue: int = 256,
+        policy: str = "drop_oldest",
+        on_close: Optional[Callable[["SubscriberChannel"], None]] = None,
+        max_backlog_bytes: int = CHANNEL_BACKLOG_BYTES,
+    ) -> None:
+        self.writer = writer
+        self.max_queue = max_queue
+        self.policy = policy
+        self.max_backlog_bytes = max_backlog_bytes
+        self.codec = NDJSON_CODEC
+        self._on_close = on_close
+        self._queue: Deque[
+            Tuple[bytes, float, bool, Optional[asyncio.Future]]
+        ] = deque()
+        self._queued_push = 0
+        # Bytes queued plus the frame being written until its drain returns.
+        self._backlog_bytes = 0
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.sent_frames = 0
+        self.sent_bytes = 0
+        self.dropped_frames = 0
+        self.collapsed_frames = 0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+
+    def send(self, data: bytes, push: bool = False, snapshot: Optional[bytes] = None) -> bool:
+        """Queue a frame without waiting for it to be written.
+
+        ``snapshot`` is the full-snapshot frame substituted by the
+        ``latest_snapshot`` policy when the queue overflows.
+        """
+        return self._enqueue(data, push, snapshot, None)
+
+    async def deliver(self, data: bytes) -> bool:
+        """Queue a reply frame and wait until it has been written and drained.
+
+        Returns ``False`` when the channel closed before the frame went out.
+        """
+        written = asyncio.get_running_loop().create_future()
+        if not self._enqueue(data, False, None, written):
+            return False
+        return await written
+
+    async def wait_writable(self) -> None:
+        """Wait while the backlog is over ``max_backlog_bytes``."""
+        await self._writable.wait()
+
+    def _enqueue(
+        self,
+        data: bytes,
+        push: bool,
+        snapshot: Optional[bytes],
+        written: Optional[asyncio.Future],
+    ) -> bool:
+        if self.closed:
+            return False
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+        if push and self._queued_push >= self.max_queue:
+            if self.policy == "disconnect":
+                LOGGER.warning(
+                    "Disconnecting slow subscriber %s (%d frames pending).",
+                    self.peer,
+                    len(self._queue),
+                )
+                self.close(abort=True)
+                return False
+            if self.policy == "latest_snapshot":
+                kept = deque(entry for entry in self._queue if not entry[2])
+                self.collapsed_frames += len(self._queue) - len(kept)
+                self._backlog_bytes -= sum(
+                    len(entry[0]) for entry in self._queue if entry[2]
+                )
+                self._queue = kept
+                self._queued_push = 0
+                data = snapshot or data
+            else:
+                for index, entry in enumerate(self._queue):
+                    if entry[2]:
+                        del self._queue[index]
+                        self._queued_push -= 1
+                        self._backlog_bytes -= len(entry[0])
+                        self.dropped_frames += 1
+                        break
+
+        self._queue.append((data, time.monotonic(), push, written))
+        if push:
+            self._queued_push += 1
+        self._backlog_bytes += len(data)
+        if self._backlog_bytes > self.max_backlog_bytes:
+            self._writable.clear()
+        else:
+            self._writable.set()
+        self._idle.clear()
+        self._wakeup.set()
+        return True
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                if not self._queue:
+                    self._idle.set()
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                data, queued_at, push, written = self._queue.popleft()
+                if push:
+                    self._queued_push -= 1
+                sent = False
+                try:
+                    self.writer.write(data)
+                    await self.writer.drain()
+                    sent = True
+                finally:
+                    if not self.closed:
+                        self._backlog_bytes -= len(data)
+                        if self._backlog_bytes <= self.max_backlog_bytes:
+                            self._writable.set()
+                    if written is not None and not written.done():
+                        written.set_result(sent)
+                self.sent_frames += 1
+                self.sent_bytes += len(data)
+                self.last_lag_seconds = time.monotonic() - queued_at
+                self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            LOGGER.warning("Failed to write to subscriber %s: %s", self.peer, error)
+            self.close(abort=True)
+
+    @property
+    def backlogged(self) -> bool:
+        return self._queued_push >= self.max_queue
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    @property
+    def peer(self):
+        get_extra_info = getattr(self.writer, "get_extra_info", None)
+        return get_extra_info("peername") if callable(get_extra_info) else None
+
+    async def flush(self) -> None:
+        """Wait until every queued frame has been written (or the channel closed)."""
+        await self._idle.wait()
+
+    def close(self, abort: bool = False) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        for entry in self._queue:
+            if entry[3] is not None and not entry[3].done():
+                entry[3].set_result(False)
+        self._queue.clear()
+        self._queued_push = 0
+        self._backlog_bytes = 0
+        self._writable.set()
+        self._idle.set()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        if abort:
+            try:
+                self.writer.close()
+            except Exception:
+                pass
+        if self._on_close is not None:
+            self._on_close(self)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "peer": str(self.peer) if self.peer is not None else None,
+            "queued": self.queued,
+            "backlogBytes": self._backlog_bytes,
+            "sentFrames": self.sent_frames,
+            "sentBytes": self.sent_bytes,
+            "droppedFrames": self.dropped_frames,
+            "collapsedFrames": self.collapsed_frames,
+            "lastLagMs": round(self.last_lag_seconds * 1000.0, 3),
+            "maxLagMs": round(self.max_lag_seconds * 1000.0, 3),
+        }
+
+
+class ConsumerCursorStore:
+    """Last acknowledged ``seq`` per named consumer, optionally persisted as JSON."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self._cursors: Dict[str, int] = {}
+        self._dirty = False
+        self._save_lock = threading.Lock()
+
+    def load(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as cursor_file:
+                stored = json.load(cursor_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as error:
+            LOGGER.warning("Unable to load consumer cursors from %s: %s", self.path, error)
+            return
+        self._cursors = {
+            str(name): int(seq)
+            for name, seq in stored.items()
+            if isinstance(seq, int) and not isinstance(seq, bool)
+        }
+
+    def get(self, name: str) -> int:
+        return self._cursors.get(name, 0)
+
+    def ack(self, name: str, seq: int) -> int:
+        """Advance ``name``'s cursor to ``seq``; cursors never move backwards."""
+        current = self._cursors.get(name, 0)
+        if seq > current:
+            self._cursors[name] = seq
+            self._dirty = True
+            return seq
+        return current
+
+    def save(self) -> None:
+        """Atomically write the cursors if any changed since the last save."""
+        if not self.path:
+            return
+        with self._save_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            cursors = dict(self._cursors)
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as cursor_file:
+                json.dump(cursors, cursor_file, sort_keys=True)
+                cursor_file.flush()
+                os.fsync(cursor_file.fileno())
+            os.replace(temporary_path, self.path)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._cursors)
+
+
+@dataclass
+class _ConsumerStream:
+    """Delivery state of one connection subscribed as a named consumer."""
+
+    name: str
+    sent_seq: int
+    catching_up: bool = True
+    notification_filter: Optional[NotificationFilter] = None
+
+
+CONSUMER_CATCH_UP_BATCH = 256
+
+
+def _record_seq(notification: Dict[str, object]) -> int:
+    seq = notification.get("seq")
+    return seq if isinstance(seq, int) and not isinstance(seq, bool) else 0
+
+
+def _delta_key(notification: Dict[str, Optional[str]]):
+    """Stable identity of a notification payload used by delta frames."""
+    notification_id = notification.get("notificationId")
+    if notification_id is not None:
+        return notification_id
+    signature = notification.get("signature")
+    if signature:
+        return signature
+    return "|".join(
+        notification.get(field) or ""
+        for field in ("timestamp", "app", "title", "body")
+    )
+
+
+def _diff_by_key(previous: Dict[object, Dict], current: Dict[object, Dict]):
+    """``(added, removed keys)`` between two keyed snapshots."""
+    added = [
+        notification
+        for key, notification in current.items()
+        if previous.get(key) != notification
+    ]
+    removed = [
+        key
+        for key, notification in previous.items()
+        if key not in current or current[key] != notification
+    ]
+    return added, removed
+
+
+class NicknameRoster:
+    """Normalized nicknames pushed by the client with ``set_nickname_roster``."""
+
+    def __init__(self) -> None:
+        self._nicknames: frozenset = frozenset()
+
+    def replace(self, nicknames) -> int:
+        normalized = (normalize_nickname(nickname) for nickname in nicknames)
+        self._nicknames = frozenset(nickname for nickname in normalized if nickname)
+        return len(self._nicknames)
+
+    def __contains__(self, nickname) -> bool:
+        return nickname in self._nicknames
+
+    def __iter__(self):
+        return iter(self._nicknames)
+
+    def __len__(self) -> int:
+        return len(self._nicknames)
+
+
+class NotificationFilter:
+    """Declarative subscriber filter, compiled once and evaluated on payloads.
+
+    Spec keys are optional and combined with AND: ``apps`` (case-insensitive
+    app allowlist), ``titleContains`` / ``bodyContains`` (case-insensitive
+    substrings), ``titleRegex`` / ``bodyRegex`` (``re.search`` patterns),
+    ``minTimestamp`` (older records and records without a timestamp are
+    excluded) and ``roster`` (only records whose "hatched" nickname is in the
+    current nickname roster).
+    """
+
+    __slots__ = (
+        "key",
+        "_roster",
+        "_apps",
+        "_title_contains",
+        "_body_contains",
+        "_title_regex",
+        "_body_regex",
+        "_min_timestamp",
+    )
+
+    _SPEC_KEYS = (
+        "apps",
+        "titleContains",
+        "bodyContains",
+        "titleRegex",
+        "bodyRegex",
+        "minTimestamp",
+        "roster",
+    )
+
+    def __init__(
+        self, spec: Dict[str, object], roster: Optional[NicknameRoster] = None
+    ) -> None:
+        if not isinstance(spec, dict):
+            raise ValueError("filter must be an object")
+        unknown = sorted(set(spec) - set(self._SPEC_KEYS))
+        if unknown:
+            raise ValueError(f"unknown filter keys: {', '.join(unknown)}")
+
+        apps = spec.get("apps")
+        if apps is not None:
+            if not isinstance(apps, list) or not all(isinstance(app, str) for app in apps):
+                raise ValueError("apps must be a list of strings")
+            self._apps = frozenset(app.strip().casefold() for app in apps)
+        else:
+            self._apps = None
+        self._title_contains = self._substring(spec, "titleContains")
+        self._body_contains = self._substring(spec, "bodyContains")
+        self._title_regex = self._regex(spec, "titleRegex")
+        self._body_regex = self._regex(spec, "bodyRegex")
+        self._min_timestamp = self._string(spec, "minTimestamp")
+        use_roster = spec.get("roster", False)
+        if not isinstance(use_roster, bool):
+            raise ValueError("roster must be a boolean")
+        if use_roster and roster is None:
+            raise ValueError("no nickname roster is available")
+        self._roster = roster if use_roster else None
+        self.key = json.dumps(spec, sort_keys=True)
+
+    @property
+    def uses_roster(self) -> bool:
+        return self._roster is not None
+
+    @staticmethod
+    def _string(spec: Dict[str, object], name: str) -> Optional[str]:
+        value = spec.get(name)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{name} must be a string")
+        return value
+
+    @classmethod
+    def _substring(cls, spec: Dict[str, object], name: str) -> Optional[str]:
+        value = cls._string(spec, name)
+        return value.casefold() if value else None
+
+    @classmethod
+    def _regex(cls, spec: Dict[str, object], name: str):
+        value = cls._string(spec, name)
+        if not value:
+            return None
+        try:
+            return re.compile(value)
+        except re.error as error:
+            raise ValueError(f"{name} is not a valid regular expression: {error}") from error
+
+    @classmethod
+    def from_message(
+        cls, message: Dict[str, object], roster: Optional[NicknameRoster] = None
+    ) -> Optional["NotificationFilter"]:
+        spec = message.get("filter")
+        if spec is None or spec == {}:
+            return None
+        return cls(spec, roster)
+
+    def matches(self, notification: Dict[str, object]) -> bool:
+        if self._roster is not None and notification.get("hatchedNickname") not in self._roster:
+            return False
+        return self._matches_fields(notification)
+
+    def _matches_fields(self, notification: Dict[str, object]) -> bool:
+        """Every condition except ``roster``."""
+        if self._apps is not None:
+            if (notification.get("app") or "").strip().casefold() not in self._apps:
+                return False
+        if self._min_timestamp is not None:
+            timestamp = notification.get("timestamp")
+            if not timestamp or timestamp < self._min_timestamp:
+                return False
+        title = notification.get("title") or ""
+        body = notification.get("body") or ""
+        if self._title_contains is not None and self._title_contains not in title.casefold():
+            return False
+        if self._body_contains is not None and self._body_contains not in body.casefold():
+            return False
+        if self._title_regex is not None and self._title_regex.search(title) is None:
+            return False
+        if self._body_regex is not None and self._body_regex.search(body) is None:
+            return False
+        return True
+
+    @property
+    def roster_only(self) -> bool:
+        return self._roster is not None and self._apps is None and not any(
+            (
+                self._title_contains,
+                self._body_contains,
+                self._title_regex,
+                self._body_regex,
+                self._min_timestamp,
+            )
+        )
+
+    def apply(self, notifications) -> List[Dict[str, object]]:
+        if self._roster is not None and isinstance(notifications, NotificationSnapshot):
+            # The snapshot's nickname index already applied the roster; only
+            # the other fields are checked per record.
+            matched = notifications.roster_matches(self._roster)
+            if self.roster_only:
+                return matched
+            return [
+                notification for notification in matched if self._matches_fields(notification)
+            ]
+        return [notification for notification in notifications if self.matches(notification)]
+
+
+def _record_timestamp(notification: Dict[str, object]) -> str:
+    timestamp = notification.get("timestamp")
+    return timestamp if isinstance(timestamp, str) else ""
+
+
+class ReadWindow:
+    """Conditional and paged view requested by ``read_notifications``.
+
+    ``ifNoneMatch`` turns the reply into a ``notModified`` stub when it equals
+    the current snapshot version. ``since`` keeps records newer than a ``seq``
+    (integer) or ISO ``timestamp`` (string), and ``limit`` caps the page. Paging
+    walks forward by ``seq`` from the oldest record, and ``nextSince`` is always
+    a ``seq``: seqs are unique and only grow, so following it never skips or
+    repeats a record. Timestamps can tie, so ``limit`` needs a ``seq`` cursor.
+    Pages are newest first: by ``seq`` when limited, otherwise in snapshot
+    order. Raises ``ValueError`` for a bad request.
+    """
+
+    __slots__ = ("since", "limit", "if_none_match")
+
+    def __init__(self, since=None, limit: Optional[int] = None, if_none_match=None) -> None:
+        if since is not None:
+            if isinstance(since, bool) or not isinstance(since, (int, str)):
+                raise ValueError("since must be a seq number or an ISO timestamp")
+            if isinstance(since, int) and since < 0:
+                raise ValueError("since must not be negative")
+        if limit is not None and (
+            isinstance(limit, bool) or not isinstance(limit, int) or limit < 1
+        ):
+            raise ValueError("limit must be a positive integer")
+        if if_none_match is not None and not isinstance(if_none_match, str):
+            raise ValueError("ifNoneMatch must be a snapshot version string")
+        if isinstance(since, str) and limit is not None:
+            raise ValueError("limit requires since to be a seq number")
+        self.since = since
+        self.limit = limit
+        self.if_none_match = if_none_match
+
+    @classmethod
+    def from_message(cls, message: Dict[str, object]) -> Optional["ReadWindow"]:
+        since = message.get("since")
+        limit = message.get("limit")
+        if_none_match = message.get("ifNoneMatch")
+        if since is None and limit is None and if_none_match is None:
+            return None
+        return cls(since, limit, if_none_match)
+
+    def not_modified(self, version: Optional[str]) -> bool:
+        return self.if_none_match is not None and self.if_none_match == version
+
+    def apply(self, notifications) -> Tuple[List[Dict[str, object]], Dict[str, object]]:
+        """Return the page and its ``hasMore``/``nextSince`` reply fields."""
+        cursor = self.since if isinstance(self.since, int) else 0
+        if isinstance(self.since, str):
+            page = [
+                record
+                for record in notifications
+                if _record_timestamp(record) > self.since
+            ]
+        elif self.since is None:
+            page = list(notifications)
+        else:
+            page = [record for record in notifications if _record_seq(record) > cursor]
+        has_more = self.limit is not None and len(page) > self.limit
+        if self.limit is not None:
+            page = sorted(page, key=_record_seq)[: self.limit]
+            page.reverse()
+        return page, {
+            "hasMore": has_more,
+            "nextSince": max((_record_seq(record) for record in page), default=cursor),
         }
 
 
+@dataclass
+class _FilteredSubscription:
+    """Per-connection filter plus the filtered snapshot last sent to it."""
+
+    notification_filter: NotificationFilter
+    last_by_key: Dict[object, Dict]
+    last_seq: int
+
+
+def _seconds(milliseconds: Optional[float]) -> Optional[float]:
+    return None if milliseconds is None else milliseconds / 1000.0
+
+
+def _invalid_request_response(error: Exception) -> Dict[str, object]:
+    return {
+        "id": None,
+        "ok": False,
+        "errorCode": "READ_FAILED",
+        "message": f"Invalid JSON request: {error}",
+        "notifications": [],
+    }
+
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+
+def _int_setting(minimum: int, maximum: Optional[int] = None) -> Callable[[object], int]:
+    def parse(value: object) -> int:
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError("must be an integer")
+        if maximum is not None and not minimum <= value <= maximum:
+            raise ValueError(f"must be between {minimum} and {maximum}")
+        if value < minimum:
+            raise ValueError(f"must be >= {minimum}")
+        return value
+
+    return parse
+
+
+def _ms_setting(minimum: float) -> Callable[[object], float]:
+    def parse(value: object) -> float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError("must be a number of milliseconds")
+        if not value >= minimum:
+            raise ValueError(f"must be >= {minimum:g}")
+        return float(value)
+
+    return parse
+
+
+def _choice_setting(choices: Sequence[str], upper: bool = False) -> Callable[[object], str]:
+    def parse(value: object) -> str:
+        if isinstance(value, str) and upper:
+            value = value.upper()
+        if value not in choices:
+            raise ValueError(f"must be one of {', '.join(choices)}")
+        return value
+
+    return parse
+
+
+# Settings that can be changed without a restart, keyed by their name in the
+# ``--config`` file and ``configure`` requests, mapped to their CLI flag
+# destination and validator.
+RUNTIME_SETTINGS: Dict[str, Tuple[str, Callable[[object], object]]] = {
+    "logLevel": ("log_level", _choice_setting(LOG_LEVELS, upper=True)),
+    "maxCache": ("max_cache", _int_setting(1)),
+    "pollIntervalMs": ("poll_interval_ms", _ms_setting(1.0)),
+    "pollFloorMs": ("poll_floor_ms", _ms_setting(1.0)),
+    "pollCeilingMs": ("poll_ceiling_ms", _ms_setting(1.0)),
+    "refreshCoalesceMs": ("refresh_coalesce_ms", _ms_setting(0.0)),
+    "subscriberQueueSize": ("subscriber_queue_size", _int_setting(1)),
+    "slowConsumerPolicy": ("slow_consumer_policy", _choice_setting(SLOW_CONSUMER_POLICIES)),
+    "maxInFlightRequests": ("max_in_flight_requests", _int_setting(1)),
+    "readRefreshMinAgeMs": ("read_refresh_min_age_ms", _ms_setting(0.0)),
+    "compressionThresholdBytes": ("compression_threshold_bytes", _int_setting(0)),
+    "compressionLevel": ("compression_level", _int_setting(0, 9)),
+}
+
+
+def validate_settings(settings: object) -> Dict[str, object]:
+    """Validate and normalize runtime settings; raises ``ValueError``."""
+    if not isinstance(settings, dict):
+        raise ValueError("settings must be an object")
+    normalized: Dict[str, object] = {}
+    for name, value in settings.items():
+        if name not in RUNTIME_SETTINGS:
+            raise ValueError(f"unknown setting {name!r}")
+        try:
+            normalized[name] = RUNTIME_SETTINGS[name][1](value)
+        except ValueError as error:
+            raise ValueError(f"{name} {error}") from None
+    return normalized
+
+
+def load_config_file(path: str) -> Dict[str, object]:
+    """Read a JSON ``--config`` file into argparse defaults keyed by flag destination."""
+    with open(path, "r", encoding="utf-8") as handle:
+        settings = validate_settings(json.load(handle))
+    return {RUNTIME_SETTINGS[name][0]: value for name, value in settings.items()}
+
+
 class TcpBridgeServer:
-    def __init__(self, host: str, port: int, collector: NotificationCollector) -> None:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        collector: NotificationCollector,
+        subscriber_queue_size: int = 256,
+        slow_consumer_policy: str = "drop_oldest",
+        cursor_store: Optional[ConsumerCursorStore] = None,
+        compression_threshold_bytes: int = 1024,
+        compression_level: int = 6,
+        tcp_enabled: bool = True,
+        unix_paths: Sequence[str] = (),
+        pipe_names: Sequence[str] = (),
+        max_in_flight_requests: int = 32,
+        read_refresh_min_age_seconds: float = 0.0,
+    ) -> None:
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
         self.host = host
         self.port = port
+        self.tcp_enabled = tcp_enabled
+        self.unix_paths = tuple(unix_paths)
+        self.pipe_names = tuple(pipe_names)
+        self._listeners: List[object] = []
+        self.max_in_flight_requests = max(max_in_flight_requests, 1)
+        self.read_refresh_min_age_seconds = max(read_refresh_min_age_seconds, 0.0)
+        self._read_refresh_stats = {"fresh": 0, "joined": 0, "cached": 0}
+        self._started_at = time.monotonic()
+        self._request_latency: Dict[str, Histogram] = {}
+        self._loop_lag = Histogram()
+        self._loop_lag_task: Optional[asyncio.Task] = None
+        self._broadcasts = 0
         self.collector = collector
+        self.subscriber_queue_size = subscriber_queue_size
+        self.slow_consumer_policy = slow_consumer_policy
         self._subscribers: Set[asyncio.StreamWriter] = set()
+        self._delta_subscribers: Set[asyncio.StreamWriter] = set()
+        self._channels: Dict[asyncio.StreamWriter, SubscriberChannel] = {}
+        self.cursor_store = cursor_store or ConsumerCursorStore()
+        self._consumers: Dict[asyncio.StreamWriter, _ConsumerStream] = {}
+        self._filtered: Dict[asyncio.StreamWriter, _FilteredSubscription] = {}
+        self.roster = NicknameRoster()
+        self.compression_threshold_bytes = compression_threshold_bytes
+        self.compression_level = compression_level
+        self._compression_stats = CompressionStats()
+        self._snapshot_seq = 0
+        self._snapshot_by_key: Optional[Dict[object, Dict[str, Optional[str]]]] = None
+        # The sequence ``_snapshot_by_key`` was built from; a
+        # ``NotificationSnapshot`` carries the nickname index filters use.
+        self._snapshot_notifications: Sequence = ()
+        self._snapshot_version: Optional[str] = None
 
     async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
-        peer = writer.get_extra_info("peername")
+        peer = (
+            writer.get_extra_info("peername")
+            or writer.get_extra_info("sockname")
+            or writer.get_extra_info("pipe")
+        )
         LOGGER.info("Client connected: %s", peer)
+        channel = self._channel_for(writer)
+        in_flight: Set[asyncio.Task] = set()
+        slots = asyncio.Semaphore(self.max_in_flight_requests)
+        graceful = False
         try:
             while not reader.at_eof():
-                line = await reader.readline()
-                if not line:
+                # Stop reading requests while this client is not taking its
+                # replies; the kernel buffer then pushes back on the client.
+                await channel.wait_writable()
+                frame = await channel.codec.read(reader)
+                if frame is None:
+                    graceful = True
                     break
 
-                response = await self._handle_message(line, writer)
+                try:
+                    message = FrameCodec.decode(*frame)
+                    concurrent = message.get("type") in CONCURRENT_REQUEST_TYPES
+                except Exception as error:
+                    response = _invalid_request_response(error)
+                else:
+                    if concurrent:
+                        # Replies are correlated by id, so slow reads run
+                        # alongside later requests. At the limit, stop reading
+                        # until one finishes.
+                        await slots.acquire()
+                        task = asyncio.create_task(
+                            self._dispatch_concurrently(message, writer, channel, slots)
+                        )
+                        in_flight.add(task)
+                        task.add_done_callback(in_flight.discard)
+                        continue
+                    response = await self._dispatch(message, writer)
                 if response is not None:
-                    sent = await self._send_json(writer, response)
-                    if not sent:
+                    if not channel.send(channel.codec.encode(response)):
                         break
+            else:
+                graceful = True
+        except asyncio.IncompleteReadError:
+            LOGGER.info("Client %s closed the connection mid-frame", peer)
         except Exception:
             LOGGER.exception("Client connection failed")
         finally:
-            self._subscribers.discard(writer)
+            if not graceful:
+                for task in in_flight:
+                    task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+            self._discard_subscriber(writer)
+            if graceful:
+                # The client only closed its sending side: every request it
+                # sent still gets its reply before the connection goes away.
+                try:
+                    await asyncio.wait_for(channel.flush(), CLOSE_FLUSH_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
+                    LOGGER.warning(
+                        "Dropping %d unsent frame(s) for %s after %.1f s",
+                        channel.queued,
+                        peer,
+                        CLOSE_FLUSH_TIMEOUT_SECONDS,
+                    )
+            channel.close(abort=not graceful)
             writer.close()
             await writer.wait_closed()
             LOGGER.info("Client disconnected: %s", peer)
+            if channel.codec.compression != "none":
+                LOGGER.info("Frame compression totals: %s", self.compression_stats())
+
+    def _channel_for(self, writer: asyncio.StreamWriter) -> SubscriberChannel:
+        channel = self._channels.get(writer)
+        if channel is None:
+            channel = SubscriberChannel(
+                writer,
+                max_queue=self.subscriber_queue_size,
+                policy=self.slow_consumer_policy,
+                on_close=self._on_channel_closed,
+            )
+            self._channels[writer] = channel
+        return channel
+
+    def _on_channel_closed(self, channel: SubscriberChannel) -> None:
+        self._discard_subscriber(channel.writer)
+
+    def _discard_subscriber(self, writer: asyncio.StreamWriter) -> None:
+        self._subscribers.discard(writer)
+        self._delta_subscribers.discard(writer)
+        self._consumers.pop(writer, None)
+        self._filtered.pop(writer, None)
+        self._channels.pop(writer, None)
+
+    async def flush_subscribers(self) -> None:
+        await asyncio.gather(*(channel.flush() for channel in list(self._channels.values())))
+
+    def subscriber_stats(self) -> List[Dict[str, object]]:
+        stats = []
+        for writer in list(self._subscribers):
+            channel = self._channels.get(writer)
+            if channel is None:
+                continue
+            entry = channel.stats()
+            entry["codec"] = channel.codec.key
+            entry["mode"] = "delta" if writer in self._delta_subscribers else "full"
+            entry["filtered"] = writer in self._filtered
+            stats.append(entry)
+        for writer, stream in list(self._consumers.items()):
+            channel = self._channels.get(writer)
+            if channel is None:
+                continue
+            entry = channel.stats()
+            entry["codec"] = channel.codec.key
+            entry["mode"] = "consumer"
+            entry["consumer"] = stream.name
+            entry["sentSeq"] = stream.sent_seq
+            entry["cursor"] = self.cursor_store.get(stream.name)
+            stats.append(entry)
+        return stats
+
+    def _current_snapshot_by_key(self) -> Dict[object, Dict[str, Optional[str]]]:
+        if self._snapshot_by_key is None:
+            snapshot = self.collector.read()
+            notifications = snapshot.get("notifications") or []
+            self._snapshot_version = snapshot.get("version")
+            self._snapshot_notifications = notifications
+            self._snapshot_by_key = {
+                _delta_key(notification): notification for notification in notifications
+            }
+        return self._snapshot_by_key
+
+    def _filtered_view(
+        self, notification_filter: NotificationFilter
+    ) -> Dict[object, Dict[str, Optional[str]]]:
+        """Records of the current snapshot matching ``notification_filter``,
+        keyed like delta frames and in snapshot order."""
+        self._current_snapshot_by_key()
+        return {
+            _delta_key(notification): notification
+            for notification in notification_filter.apply(self._snapshot_notifications)
+        }
 
-    async def _send_json(self, writer: asyncio.StreamWriter, payload: Dict[str, object]) -> bool:
+    async def _dispatch_concurrently(
+        self,
+        message: Dict[str, object],
+        writer: asyncio.StreamWriter,
+        channel: SubscriberChannel,
+        slots: asyncio.Semaphore,
+    ) -> None:
         try:
-            writer.write((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
-            await writer.drain()
-            return True
-        except Exception:
-            self._subscribers.discard(writer)
-            LOGGER.exception("Failed to write response/event to subscriber")
-            return False
+            response = await self._dispatch(message, writer)
+            if response is not None:
+                # Encoded at send time, so a hello processed meanwhile applies.
+                # The slot is held until the reply is written, so the in-flight
+                # limit also bounds replies waiting on a slow client.
+                await channel.deliver(channel.codec.encode(response))
+        finally:
+            slots.release()
 
     async def _handle_message(
-        self, raw: bytes, writer: asyncio.StreamWriter
+        self, raw: bytes, writer: asyncio.StreamWriter, flags: int = 0
+    ) -> Optional[Dict[str, object]]:
+        try:
+            message = FrameCodec.decode(raw, flags)
+        except Exception as error:
+            return _invalid_request_response(error)
+        return await self._dispatch(message, writer)
+
+    async def _dispatch(
+        self, message: Dict[str, object], writer: asyncio.StreamWriter
+    ) -> Optional[Dict[str, object]]:
+        started = time.perf_counter()
+        try:
+            return await self._dispatch_request(message, writer)
+        finally:
+            message_type = message.get("type") if isinstance(message, dict) else None
+            if message_type not in REQUEST_TYPES:
+                message_type = "other"
+            histogram = self._request_latency.get(message_type)
+            if histogram is None:
+                histogram = self._request_latency[message_type] = Histogram()
+            histogram.record_seconds(time.perf_counter() - started)
+
+    async def _dispatch_request(
+        self, message: Dict[str, object], writer: asyncio.StreamWriter
     ) -> Optional[Dict[str, object]]:
         try:
-            message = json.loads(raw.decode("utf-8"))
             request_id = message.get("id")
             message_type = message.get("type")
             if message_type == "ping":
                 return {"id": request_id, "ok": True, "type": "pong"}
+            if message_type == "hello":
+                return self._hello(request_id, message, writer)
+            if message_type in ("read_notifications", "subscribe_notifications"):
+                try:
+                    notification_filter = NotificationFilter.from_message(
+                        message, self.roster
+                    )
+                except ValueError as error:
+                    return {
+                        "id": request_id,
+                        "ok": False,
+                        "errorCode": "READ_FAILED",
+                        "message": f"Invalid filter: {error}",
+                        "notifications": [],
+                    }
             if message_type == "read_notifications":
-                if not self.collector.is_push_subscription_active():
+                try:
+                    read_window = ReadWindow.from_message(message)
+                except ValueError as error:
+                    return {
+                        "id": request_id,
+                        "ok": False,
+                        "errorCode": "READ_FAILED",
+                        "message": f"Invalid read window: {error}",
+                        "notifications": [],
+                    }
+                push_active = self.collector.is_push_subscription_active()
+                if not push_active:
+                    self.collector.note_read_request()
                     try:
-                        await self.collector.refresh_snapshot()
+                        refresh = await self._refresh_for_read()
                     except Exception as error:
+                        refresh = "failed"
                         LOGGER.warning(
                             "Refresh before read_notifications failed, using cached snapshot: %s",
                             error,
                         )
                 payload = self.collector.read()
                 payload["id"] = request_id
+                # The snapshot version does not cover roster changes, so
+                # roster-filtered reads are never answered as not modified.
+                conditional = read_window is not None and not (
+                    notification_filter is not None and notification_filter.uses_roster
+                )
+                if (
+                    conditional
+                    and payload.get("ok")
+                    and read_window.not_modified(payload.get("version"))
+                ):
+                    payload = {
+                        "id": request_id,
+                        "ok": True,
+                        "notModified": True,
+                        "version": payload["version"],
+                    }
+                else:
+                    if notification_filter is not None and payload.get("ok"):
+                        payload["notifications"] = notification_filter.apply(
+                            payload["notifications"]
+                        )
+                    if read_window is not None and payload.get("ok"):
+                        payload["notifications"], page_fields = read_window.apply(
+                            payload["notifications"]
+                        )
+                        payload.update(page_fields)
+                if not push_active:
+                    payload["poll"] = self.collector.poll_stats()
+                    payload["refresh"] = refresh
                 return payload
+            if message_type == "ack_notifications":
+                return await self._ack_consumer(request_id, message)
+            if message_type == "set_nickname_roster":
+                return self._set_nickname_roster(request_id, message)
+            if message_type == "configure":
+                return await self._configure(request_id, message)
+            if message_type == "stats":
+                return {"id": request_id, "ok": True, "type": "stats", **self.stats()}
+            if message_type == "profile":
+                return self._profile(request_id, message)
             if message_type == "subscribe_notifications":
+                if message.get("consumer") is not None:
+                    return await self._subscribe_consumer(
+                        request_id, message.get("consumer"), writer, notification_filter
+                    )
+                mode = message.get("mode") or "full"
+                if mode not in SUBSCRIPTION_MODES:
+                    return {
+                        "id": request_id,
+                        "ok": False,
+                        "errorCode": "READ_FAILED",
+                        "message": f"Unknown subscription mode: {mode}",
+                        "notifications": [],
+                    }
                 self._subscribers.add(writer)
+                if mode == "delta":
+                    self._delta_subscribers.add(writer)
+                else:
+                    self._delta_subscribers.discard(writer)
+                if notification_filter is None:
+                    self._filtered.pop(writer, None)
+                else:
+                    # Full-mode subscribers have no baseline yet, so their
+                    # first matching snapshot is always sent.
+                    self._filtered[writer] = _FilteredSubscription(
+                        notification_filter=notification_filter,
+                        last_by_key=(
+                            self._filtered_view(notification_filter)
+                            if mode == "delta"
+                            else {}
+                        ),
+                        last_seq=self._snapshot_seq,
+                    )
+
                 if not self.collector.is_push_subscription_active():
-                    return {
+                    response = {
                         "id": request_id,
                         "ok": True,
                         "pushActive": False,
@@ -1226,80 +4009,1129 @@ class TcpBridgeServer:
                             "poll using read_notifications."
                         ),
                     }
-                return {
+                else:
+                    response = {
+                        "id": request_id,
+                        "ok": True,
+                        "pushActive": True,
+                        "message": "Subscribed to notifications push events.",
+                    }
+                if mode == "delta":
+                    # The subscribe reply carries the full baseline; later frames
+                    # are deltas against it until the client detects a gap.
+                    response["mode"] = "delta"
+                    if notification_filter is None:
+                        baseline = list(self._current_snapshot_by_key().values())
+                    else:
+                        baseline = list(self._filtered[writer].last_by_key.values())
+                    response["seq"] = self._snapshot_seq
+                    response["version"] = self._snapshot_version
+                    response["notifications"] = baseline
+                return response
+            return {
+                "id": request_id,
+                "ok": False,
+                "errorCode": "READ_FAILED",
+                "message": f"Unknown request type: {message_type}",
+                "notifications": [],
+            }
+        except Exception as error:
+            return _invalid_request_response(error)
+
+    async def _refresh_for_read(self) -> str:
+        """Refresh the collector before a fallback-mode read, shared across readers.
+
+        Readers arriving while the collector's shared refresh is in flight
+        (started by a read, the poll loop or a change event) join it
+        (``"joined"``); within ``read_refresh_min_age_seconds`` of the last one
+        completing the cached snapshot is served as is (``"cached"``);
+        otherwise a new refresh starts (``"fresh"``).
+        """
+        pending = self.collector.refresh_in_flight()
+        if pending is not None:
+            self._read_refresh_stats["joined"] += 1
+            await asyncio.shield(pending)
+            return "joined"
+        completed_at = self.collector.refresh_completed_at
+        if (
+            completed_at is not None
+            and time.monotonic() - completed_at < self.read_refresh_min_age_seconds
+        ):
+            self._read_refresh_stats["cached"] += 1
+            return "cached"
+
+        self._read_refresh_stats["fresh"] += 1
+        # Shielded so a reader disconnecting does not cancel the joiners' refresh.
+        await asyncio.shield(self.collector.shared_refresh())
+        return "fresh"
+
+    def read_refresh_stats(self) -> Dict[str, int]:
+        return dict(self._read_refresh_stats)
+
+    def stats(self) -> Dict[str, object]:
+        """Counters and latency histograms for sizing hosts and spotting regressions."""
+        return {
+            "uptimeSeconds": round(time.monotonic() - self._started_at, 3),
+            "collector": self.collector.metrics(),
+            "requestsUs": {
+                message_type: histogram.stats()
+                for message_type, histogram in sorted(self._request_latency.items())
+            },
+            "eventLoopLagUs": self._loop_lag.stats(),
+            "broadcasts": self._broadcasts,
+            "readRefresh": self.read_refresh_stats(),
+            "compression": self.compression_stats(),
+            "subscribers": self.subscriber_stats(),
+        }
+
+    def _profile(self, request_id, message) -> Dict[str, object]:
+        seconds = message.get("seconds", 10)
+        mode = message.get("mode") or "cprofile"
+        try:
+            path = self.collector.start_profile_window(seconds, mode)
+        except (RuntimeError, ValueError) as error:
+            return {
+                "id": request_id,
+                "ok": False,
+                "errorCode": "READ_FAILED",
+                "message": f"Cannot start profiling: {error}",
+            }
+        return {
+            "id": request_id,
+            "ok": True,
+            "type": "profile",
+            "mode": mode,
+            "seconds": seconds,
+            "path": path,
+        }
+
+    async def _sample_loop_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LOOP_LAG_SAMPLE_SECONDS
+            await asyncio.sleep(LOOP_LAG_SAMPLE_SECONDS)
+            self._loop_lag.record_seconds(max(loop.time() - expected, 0.0))
+
+    def settings(self) -> Dict[str, object]:
+        """Effective values of every ``RUNTIME_SETTINGS`` entry."""
+        return {
+            "logLevel": logging.getLevelName(logging.getLogger().getEffectiveLevel()),
+            **self.collector.tuning(),
+            "subscriberQueueSize": self.subscriber_queue_size,
+            "slowConsumerPolicy": self.slow_consumer_policy,
+            "maxInFlightRequests": self.max_in_flight_requests,
+            "readRefreshMinAgeMs": self.read_refresh_min_age_seconds * 1000.0,
+            "compressionThresholdBytes": self.compression_threshold_bytes,
+            "compressionLevel": self.compression_level,
+        }
+
+    async def configure(self, settings: object) -> Dict[str, object]:
+        """Validate and apply runtime settings; returns the effective values.
+
+        Nothing is applied unless every setting is valid. Queue bounds and the
+        slow-consumer policy apply to existing connections; the in-flight limit
+        and compression settings apply to connections and ``hello`` requests
+        made afterwards.
+        """
+        changes = validate_settings(settings)
+        merged = {**self.settings(), **changes}
+        if not merged["pollFloorMs"] <= merged["pollIntervalMs"] <= merged["pollCeilingMs"]:
+            raise ValueError("pollFloorMs <= pollIntervalMs <= pollCeilingMs must hold")
+
+        if "logLevel" in changes:
+            logging.getLogger().setLevel(changes["logLevel"])
+        await self.collector.apply_tuning(
+            max_cache=changes.get("maxCache"),
+            poll_interval_seconds=_seconds(changes.get("pollIntervalMs")),
+            poll_floor_seconds=_seconds(changes.get("pollFloorMs")),
+            poll_ceiling_seconds=_seconds(changes.get("pollCeilingMs")),
+            coalesce_window_seconds=_seconds(changes.get("refreshCoalesceMs")),
+        )
+        if "subscriberQueueSize" in changes or "slowConsumerPolicy" in changes:
+            self.subscriber_queue_size = merged["subscriberQueueSize"]
+            self.slow_consumer_policy = merged["slowConsumerPolicy"]
+            for channel in self._channels.values():
+                channel.max_queue = self.subscriber_queue_size
+                channel.policy = self.slow_consumer_policy
+        if "maxInFlightRequests" in changes:
+            self.max_in_flight_requests = changes["maxInFlightRequests"]
+        if "readRefreshMinAgeMs" in changes:
+            self.read_refresh_min_age_seconds = changes["readRefreshMinAgeMs"] / 1000.0
+        if "compressionThresholdBytes" in changes:
+            self.compression_threshold_bytes = changes["compressionThresholdBytes"]
+        if "compressionLevel" in changes:
+            self.compression_level = changes["compressionLevel"]
+        if changes:
+            LOGGER.info("Runtime settings changed: %s", changes)
+        return self.settings()
+
+    async def _configure(self, request_id, message) -> Dict[str, object]:
+        try:
+            effective = await self.configure(message.get("settings") or {})
+        except ValueError as error:
+            return {
+                "id": request_id,
+                "ok": False,
+                "errorCode": "READ_FAILED",
+                "message": f"Invalid settings: {error}",
+                "settings": self.settings(),
+            }
+        return {"id": request_id, "ok": True, "type": "configure", "settings": effective}
+
+    def _hello(self, request_id, message, writer: asyncio.StreamWriter) -> None:
+        """Negotiate protocol version, framing and encoding for this connection.
+
+        The reply is written in the current format; every later frame in both
+        directions uses the negotiated one. Unsupported choices fall back to
+        NDJSON/JSON, so old clients that never send ``hello`` are unaffected.
+        """
+        framing = message.get("framing") or "ndjson"
+        if framing not in FRAMINGS:
+            framing = "ndjson"
+        encoding = message.get("encoding") or "json"
+        if framing == "ndjson" or encoding not in supported_encodings():
+            encoding = "json"
+        compression = message.get("compression") or "none"
+        if framing == "ndjson" or compression not in COMPRESSIONS:
+            compression = "none"
+        client_version = message.get("protocolVersion")
+        if isinstance(client_version, bool) or not isinstance(client_version, int):
+            client_version = PROTOCOL_VERSION
+
+        response = {
+            "id": request_id,
+            "ok": True,
+            "type": "hello",
+            "protocolVersion": min(client_version, PROTOCOL_VERSION),
+            "serverProtocolVersion": PROTOCOL_VERSION,
+            "framing": framing,
+            "encoding": encoding,
+            "compression": compression,
+            "framings": list(FRAMINGS),
+            "encodings": list(supported_encodings()),
+            "compressions": list(COMPRESSIONS),
+            "features": self.features(),
+        }
+        if compression != "none":
+            response["compressionThresholdBytes"] = self.compression_threshold_bytes
+            response["compressionDictionary"] = base64.b64encode(
+                COMPRESSION_DICTIONARY
+            ).decode("ascii")
+
+        channel = self._channel_for(writer)
+        channel.send(channel.codec.encode(response))
+        channel.codec = FrameCodec(
+            framing,
+            encoding,
+            compression=compression,
+            compression_threshold=self.compression_threshold_bytes,
+            compression_level=self.compression_level,
+            compression_stats=self._compression_stats,
+        )
+        return None
+
+    def compression_stats(self) -> Dict[str, float]:
+        return self._compression_stats.stats()
+
+    def features(self) -> List[str]:
+        """Optional protocol features this server supports."""
+        features = [
+            "delta",
+            "filters",
+            "consumers",
+            "nickname_roster",
+            "signatures",
+            "length_prefixed_framing",
+            "zlib_compression",
+            "configure",
+            "stats",
+            "profile",
+        ]
+        if msgpack is not None:
+            features.append("msgpack")
+        return features
+
+    async def _subscribe_consumer(
+        self,
+        request_id,
+        name,
+        writer: asyncio.StreamWriter,
+        notification_filter: Optional[NotificationFilter] = None,
+    ) -> Optional[Dict[str, object]]:
+        """Stream records after the consumer's acknowledged cursor, then live records.
+
+        The reply is queued here so the catch-up frames follow it in order;
+        broadcasts skip the stream until the catch-up has been queued.
+        """
+        if not isinstance(name, str) or not name.strip():
+            return {
+                "id": request_id,
+                "ok": False,
+                "errorCode": "READ_FAILED",
+                "message": "Consumer name must be a non-empty string.",
+                "notifications": [],
+            }
+        self._subscribers.discard(writer)
+        self._delta_subscribers.discard(writer)
+        self._filtered.pop(writer, None)
+        cursor = self.cursor_store.get(name)
+        stream = _ConsumerStream(
+            name=name, sent_seq=cursor, notification_filter=notification_filter
+        )
+        self._consumers[writer] = stream
+        channel = self._channel_for(writer)
+
+        records, oldest_seq = await self.collector.records_since(cursor)
+        # Records between the cursor and the oldest retained one are gone
+        # (journal segments rotated out, or no journal at all).
+        gap = oldest_seq is not None and oldest_seq > cursor + 1
+        if gap:
+            LOGGER.warning(
+                "Consumer %r cursor %d predates the oldest available record %d; "
+                "records in between cannot be replayed.",
+                name,
+                cursor,
+                oldest_seq,
+            )
+        if records:
+            stream.sent_seq = max(stream.sent_seq, _record_seq(records[-1]))
+        # Records published while the journal was being read.
+        live = sorted(
+            (
+                notification
+                for notification in self.collector.snapshot()
+                if _record_seq(notification) > stream.sent_seq
+            ),
+            key=_record_seq,
+        )
+        if live:
+            records.extend(live)
+            stream.sent_seq = _record_seq(live[-1])
+        stream.catching_up = False
+        if notification_filter is not None:
+            records = notification_filter.apply(records)
+
+        channel.send(
+            channel.codec.encode(
+                {
                     "id": request_id,
                     "ok": True,
-                    "pushActive": True,
-                    "message": "Subscribed to notifications push events.",
+                    "consumer": name,
+                    "cursor": cursor,
+                    "catchUpRecords": len(records),
+                    "oldestSeq": oldest_seq,
+                    "gap": gap,
+                    "pushActive": self.collector.is_push_subscription_active(),
+                    "message": "Subscribed as named consumer.",
                 }
+            )
+        )
+        for start in range(0, len(records), CONSUMER_CATCH_UP_BATCH):
+            channel.send(
+                channel.codec.encode(
+                    {
+                        "type": "notification_records",
+                        "catchUp": True,
+                        "records": records[start : start + CONSUMER_CATCH_UP_BATCH],
+                    }
+                )
+            )
+        LOGGER.info(
+            "Consumer %r subscribed from cursor %d; %d catch-up records queued.",
+            name,
+            cursor,
+            len(records),
+        )
+        return None
+
+    async def _ack_consumer(self, request_id, message) -> Dict[str, object]:
+        name = message.get("consumer")
+        seq = message.get("seq")
+        if (
+            not isinstance(name, str)
+            or not name.strip()
+            or isinstance(seq, bool)
+            or not isinstance(seq, int)
+            or seq < 0
+        ):
             return {
                 "id": request_id,
                 "ok": False,
                 "errorCode": "READ_FAILED",
-                "message": f"Unknown request type: {message_type}",
+                "message": "ack_notifications requires a consumer name and a non-negative integer seq.",
                 "notifications": [],
             }
-        except Exception as error:
+        cursor = self.cursor_store.ack(name, seq)
+        await asyncio.get_running_loop().run_in_executor(None, self.cursor_store.save)
+        return {"id": request_id, "ok": True, "consumer": name, "cursor": cursor}
+
+    def _set_nickname_roster(self, request_id, message) -> Dict[str, object]:
+        nicknames = message.get("nicknames")
+        if not isinstance(nicknames, list) or not all(
+            isinstance(nickname, str) for nickname in nicknames
+        ):
             return {
-                "id": None,
+                "id": request_id,
                 "ok": False,
                 "errorCode": "READ_FAILED",
-                "message": f"Invalid JSON request: {error}",
+                "message": "set_nickname_roster requires a list of nickname strings.",
                 "notifications": [],
             }
+        roster_size = self.roster.replace(nicknames)
+        # Re-evaluate roster-filtered subscribers against the current snapshot.
+        cache: Dict[object, object] = {}
+        for writer, subscription in list(self._filtered.items()):
+            if not subscription.notification_filter.uses_roster:
+                continue
+            self._send_filtered(
+                self._channel_for(writer),
+                subscription,
+                writer in self._delta_subscribers,
+                self._snapshot_version,
+                cache,
+            )
+        matched = len(self.collector.snapshot().roster_matches(self.roster))
+        LOGGER.info(
+            "Nickname roster updated: %d nicknames, %d matching notifications.",
+            roster_size,
+            matched,
+        )
+        return {"id": request_id, "ok": True, "rosterSize": roster_size, "matched": matched}
+
+    def _send_consumer_records(self, notifications: Sequence) -> None:
+        """Queue records newer than each stream's last sent ``seq``.
+
+        Streams that sent up to the same ``seq`` share one encoded frame. A
+        backlogged stream is disconnected rather than losing records; it
+        resumes from its acknowledged cursor on reconnect.
+        """
+        ordered = sorted(
+            (item for item in notifications if _record_seq(item) > 0), key=_record_seq
+        )
+        frames: Dict[Tuple[int, Optional[str]], Tuple[Optional[_OutboundFrame], int]] = {}
+        for writer, stream in list(self._consumers.items()):
+            if stream.catching_up:
+                continue
+            notification_filter = stream.notification_filter
+            cache_key = (
+                stream.sent_seq,
+                notification_filter.key if notification_filter is not None else None,
+            )
+            if cache_key not in frames:
+                candidates = [
+                    item for item in ordered if _record_seq(item) > stream.sent_seq
+                ]
+                records = (
+                    notification_filter.apply(candidates)
+                    if notification_filter is not None
+                    else candidates
+                )
+                frames[cache_key] = (
+                    _OutboundFrame({"type": "notification_records", "records": records})
+                    if records
+                    else None,
+                    _record_seq(candidates[-1]) if candidates else stream.sent_seq,
+                )
+            outbound, sent_seq = frames[cache_key]
+            # Non-matching records still advance the stream past them.
+            stream.sent_seq = sent_seq
+            if outbound is None:
+                continue
+            channel = self._channel_for(writer)
+            if channel.backlogged:
+                LOGGER.warning(
+                    "Disconnecting backlogged consumer %r (%s); it will resume from its cursor.",
+                    stream.name,
+                    channel.peer,
+                )
+                channel.close(abort=True)
+                continue
+            channel.send(outbound.encode(channel.codec), push=True)
+
+    def _build_delta(
+        self,
+        notifications: Sequence,
+        version: Optional[str] = None,
+    ) -> Optional[Dict[str, object]]:
+        """Diff the new snapshot against the last one and advance ``seq``.
+
+        Returns ``None`` when membership did not change (e.g. reordering only).
+        """
+        previous = self._current_snapshot_by_key()
+        current = {_delta_key(notification): notification for notification in notifications}
+        self._snapshot_by_key = current
+        self._snapshot_notifications = notifications
+        self._snapshot_version = version
+
+        added, removed = _diff_by_key(previous, current)
+        if not added and not removed:
+            return None
+
+        base_seq = self._snapshot_seq
+        self._snapshot_seq += 1
+        return {
+            "type": "notifications_delta",
+            "seq": self._snapshot_seq,
+            "baseSeq": base_seq,
+            "version": version,
+            "added": added,
+            "removed": removed,
+        }
 
     async def broadcast_notifications(
-        self, notifications: List[Dict[str, Optional[str]]]
+        self,
+        notifications: Sequence,
+        version: Optional[str] = None,
     ) -> None:
+        self._broadcasts += 1
+        delta_frame = self._build_delta(notifications, version)
         LOGGER.info(
-            "Broadcasting notifications snapshot: %d items to %d subscribers",
+            "Broadcasting notifications snapshot: %d items to %d subscribers (%d delta)",
             len(notifications),
             len(self._subscribers),
+            len(self._delta_subscribers),
         )
+        if self._consumers:
+            self._send_consumer_records(notifications)
         if not self._subscribers:
             return
 
         frame: Dict[str, object] = {
             "type": "notifications",
+            "seq": self._snapshot_seq,
+            "version": version,
             "notifications": notifications,
         }
-        dead_subscribers: List[asyncio.StreamWriter] = []
-        for subscriber in self._subscribers:
-            sent = await self._send_json(subscriber, frame)
-            if not sent:
-                dead_subscribers.append(subscriber)
+        # Each frame is encoded once per wire format; the same bytes are queued
+        # on every subscriber's channel and written concurrently by their own tasks.
+        full = _OutboundFrame(frame)
+        delta = _OutboundFrame(delta_frame) if delta_frame is not None else None
+        filtered_frames: Dict[object, object] = {}
+        for subscriber in list(self._subscribers):
+            channel = self._channel_for(subscriber)
+            subscription = self._filtered.get(subscriber)
+            if subscription is not None:
+                self._send_filtered(
+                    channel,
+                    subscription,
+                    subscriber in self._delta_subscribers,
+                    version,
+                    filtered_frames,
+                )
+                continue
+            full_bytes = full.encode(channel.codec)
+            if subscriber in self._delta_subscribers:
+                if delta is None:
+                    continue
+                channel.send(delta.encode(channel.codec), push=True, snapshot=full_bytes)
+            else:
+                channel.send(full_bytes, push=True, snapshot=full_bytes)
 
-        for subscriber in dead_subscribers:
-            self._subscribers.discard(subscriber)
+    def _send_filtered(
+        self,
+        channel: SubscriberChannel,
+        subscription: _FilteredSubscription,
+        delta: bool,
+        version: Optional[str],
+        cache: Dict[object, object],
+    ) -> None:
+        """Queue the filtered view of the current snapshot for one subscriber.
+
+        Only matching records are serialized. Filtered views, diffs and frames
+        are cached per filter (and per previous view), so subscribers sharing
+        a filter share the work. Nothing is sent when the view is unchanged;
+        delta frames carry this subscriber's own ``baseSeq``.
+        """
+        notification_filter = subscription.notification_filter
+        view_key = ("view", notification_filter.key)
+        current = cache.get(view_key)
+        if current is None:
+            current = self._filtered_view(notification_filter)
+            cache[view_key] = current
+
+        previous = subscription.last_by_key
+        diff_key = ("diff", notification_filter.key, id(previous))
+        cached_diff = cache.get(diff_key)
+        if cached_diff is None:
+            # Keeping ``previous`` referenced pins its id for this broadcast.
+            cached_diff = (previous, _diff_by_key(previous, current))
+            cache[diff_key] = cached_diff
+        added, removed = cached_diff[1]
+        if not added and not removed:
+            return
+
+        full_key = ("full", notification_filter.key)
+        full = cache.get(full_key)
+        if full is None:
+            full = _OutboundFrame(
+                {
+                    "type": "notifications",
+                    "seq": self._snapshot_seq,
+                    "version": version,
+                    "notifications": list(current.values()),
+                }
+            )
+            cache[full_key] = full
+        full_bytes = full.encode(channel.codec)
+
+        if delta:
+            delta_key = ("delta", notification_filter.key, id(previous), subscription.last_seq)
+            delta_frame = cache.get(delta_key)
+            if delta_frame is None:
+                delta_frame = _OutboundFrame(
+                    {
+                        "type": "notifications_delta",
+                        "seq": self._snapshot_seq,
+                        "baseSeq": subscription.last_seq,
+                        "version": version,
+                        "added": added,
+                        "removed": removed,
+                    }
+                )
+                cache[delta_key] = delta_frame
+            channel.send(delta_frame.encode(channel.codec), push=True, snapshot=full_bytes)
+        else:
+            channel.send(full_bytes, push=True, snapshot=full_bytes)
+        subscription.last_by_key = current
+        subscription.last_seq = self._snapshot_seq
+
+    async def start_listeners(self) -> List[str]:
+        """Bind every configured transport and return their addresses.
+
+        TCP (``host``/``port``), AF_UNIX sockets (``unix_paths``) and Windows
+        named pipes (``pipe_names``) all feed the same ``handle_client``, so
+        every request, subscription and framing works identically on each.
+        """
+        if not (self.tcp_enabled or self.unix_paths or self.pipe_names):
+            raise ValueError("No IPC listener configured")
+        if self._loop_lag_task is None:
+            self._loop_lag_task = asyncio.create_task(self._sample_loop_lag())
+        addresses: List[str] = []
+        try:
+            if self.tcp_enabled:
+                server = await asyncio.start_server(self.handle_client, self.host, self.port)
+                self._listeners.append(server)
+                addresses.extend(
+                    f"tcp://{sock.getsockname()[0]}:{sock.getsockname()[1]}"
+                    for sock in server.sockets or []
+                )
+            for path in self.unix_paths:
+                self._listeners.append(await self._start_unix_listener(path))
+                addresses.append(f"unix:{path}")
+            for name in self.pipe_names:
+                self._listeners.extend(await self._start_pipe_listener(name))
+                addresses.append(f"pipe:{name}")
+        except BaseException:
+            await self.close_listeners()
+            raise
+        return addresses
+
+    async def _start_unix_listener(self, path: str) -> asyncio.AbstractServer:
+        if not hasattr(asyncio, "start_unix_server"):
+            raise RuntimeError("AF_UNIX sockets are not supported on this platform")
+        try:
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                # Left behind by a previous run that did not shut down cleanly.
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+        server = await asyncio.start_unix_server(self.handle_client, path)
+        # Only the daemon's user may connect, unlike a loopback TCP port.
+        os.chmod(path, 0o600)
+        return server
+
+    async def _start_pipe_listener(self, name: str) -> List[object]:
+        loop = asyncio.get_running_loop()
+        if not hasattr(loop, "start_serving_pipe"):
+            raise RuntimeError("Named pipes require the Windows proactor event loop")
+
+        def protocol_factory() -> asyncio.StreamReaderProtocol:
+            return asyncio.StreamReaderProtocol(asyncio.StreamReader(), self.handle_client)
+
+        return await loop.start_serving_pipe(protocol_factory, name)
+
+    async def close_listeners(self) -> None:
+        if self._loop_lag_task is not None:
+            self._loop_lag_task.cancel()
+            try:
+                await self._loop_lag_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_lag_task = None
+        listeners, self._listeners = self._listeners, []
+        for listener in listeners:
+            listener.close()
+        for listener in listeners:
+            if isinstance(listener, asyncio.AbstractServer):
+                await listener.wait_closed()
+        for path in self.unix_paths:
+            try:
+                if stat.S_ISSOCK(os.stat(path).st_mode):
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
 
     async def run(self) -> None:
-        server = await asyncio.start_server(self.handle_client, self.host, self.port)
-        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets or [])
-        LOGGER.info("IPC server listening on %s", addresses)
-        async with server:
-            await server.serve_forever()
+        addresses = await self.start_listeners()
+        LOGGER.info("IPC server listening on %s", ", ".join(addresses))
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.close_listeners()
+
+
+def _metric_label(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _metric_value(value: object) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_openmetrics(stats: Dict[str, object]) -> str:
+    """Render a ``TcpBridgeServer.stats()`` dict as OpenMetrics text."""
+    lines: List[str] = []
+
+    def family(name: str, metric_type: str, help_text: str) -> None:
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"# HELP {name} {help_text}")
+
+    def sample(name: str, value: object, **labels: object) -> None:
+        if value is None:
+            return
+        label_text = ",".join(f'{key}="{_metric_label(val)}"' for key, val in labels.items())
+        lines.append(
+            f"{name}{{{label_text}}} {_metric_value(value)}"
+            if label_text
+            else f"{name} {_metric_value(value)}"
+        )
+
+    def summary(name: str, histograms: Dict[str, Dict[str, object]], label: str) -> None:
+        # Histograms record microseconds; OpenMetrics wants base units.
+        for key, histogram in histograms.items():
+            for quantile in ("p50", "p90", "p99", "p999"):
+                if histogram[quantile] is not None:
+                    sample(
+                        name,
+                        histogram[quantile] / 1_000_000,
+                        **{label: key, "quantile": "0." + quantile[1:]},
+                    )
+            sample(f"{name}_count", histogram["count"], **{label: key})
+            sample(f"{name}_sum", histogram["sum"] / 1_000_000, **{label: key})
+
+    collector = stats["collector"]
+    prefix = "winrt_daemon"
+    family(f"{prefix}_available", "gauge", "Whether the WinRT notification API is usable.")
+    sample(f"{prefix}_available", collector["available"])
+    family(
+        f"{prefix}_push_subscription_active",
+        "gauge",
+        "Whether WinRT change events are pushed (1) or the daemon polls (0).",
+    )
+    sample(f"{prefix}_push_subscription_active", collector["pushSubscriptionActive"])
+    family(f"{prefix}_notification_kind_source", "info", "How the toast kind was resolved.")
+    sample(
+        f"{prefix}_notification_kind_source_info",
+        1,
+        source=collector["notificationKindSource"] or "unknown",
+    )
+    family(f"{prefix}_snapshot_notifications", "gauge", "Notifications in the snapshot.")
+    sample(f"{prefix}_snapshot_notifications", collector["snapshotLength"])
+    family(f"{prefix}_snapshot_age_seconds", "gauge", "Seconds since a snapshot was published.")
+    sample(f"{prefix}_snapshot_age_seconds", collector["snapshotAgeSeconds"])
+    family(
+        f"{prefix}_snapshot_changed_age_seconds",
+        "gauge",
+        "Seconds since the snapshot content last changed.",
+    )
+    sample(f"{prefix}_snapshot_changed_age_seconds", collector["snapshotChangedAgeSeconds"])
+    family(f"{prefix}_refresh_seconds", "summary", "Snapshot refresh duration by phase.")
+    summary(f"{prefix}_refresh_seconds", collector["refreshUs"], "phase")
+    family(f"{prefix}_change_events", "counter", "WinRT notification-changed events received.")
+    sample(f"{prefix}_change_events_total", collector["changeEvents"]["received"])
+    family(f"{prefix}_worker_queue_depth", "gauge", "Calls queued on the WinRT worker thread.")
+    sample(f"{prefix}_worker_queue_depth", collector["worker"]["queueDepth"])
+    family(f"{prefix}_request_seconds", "summary", "IPC request handling latency by type.")
+    summary(f"{prefix}_request_seconds", stats["requestsUs"], "type")
+    family(f"{prefix}_event_loop_lag_seconds", "summary", "Sampled asyncio event-loop lag.")
+    summary(f"{prefix}_event_loop_lag_seconds", {"ipc": stats["eventLoopLagUs"]}, "loop")
+    family(f"{prefix}_broadcasts", "counter", "Snapshots pushed to subscribers.")
+    sample(f"{prefix}_broadcasts_total", stats["broadcasts"])
+
+    subscribers = stats["subscribers"]
+    modes: Dict[str, int] = {}
+    for subscriber in subscribers:
+        modes[subscriber["mode"]] = modes.get(subscriber["mode"], 0) + 1
+    family(f"{prefix}_subscribers", "gauge", "Connected subscribers by mode.")
+    for mode in ("full", "delta", "consumer"):
+        sample(f"{prefix}_subscribers", modes.get(mode, 0), mode=mode)
+    family(f"{prefix}_subscriber_queued_frames", "gauge", "Frames queued for subscribers.")
+    sample(
+        f"{prefix}_subscriber_queued_frames",
+        sum(subscriber["queued"] for subscriber in subscribers),
+        aggregate="sum",
+    )
+    sample(
+        f"{prefix}_subscriber_queued_frames",
+        max((subscriber["queued"] for subscriber in subscribers), default=0),
+        aggregate="max",
+    )
+    # Per-connection totals vanish on disconnect, so these are gauges.
+    family(
+        f"{prefix}_subscriber_sent_bytes",
+        "gauge",
+        "Bytes sent to currently connected subscribers.",
+    )
+    sample(
+        f"{prefix}_subscriber_sent_bytes",
+        sum(subscriber["sentBytes"] for subscriber in subscribers),
+    )
+    family(
+        f"{prefix}_subscriber_dropped_frames",
+        "gauge",
+        "Frames dropped by the slow-consumer policy for connected subscribers.",
+    )
+    sample(
+        f"{prefix}_subscriber_dropped_frames",
+        sum(subscriber["droppedFrames"] for subscriber in subscribers),
+    )
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
 
+class OpenMetricsExporter:
+    """Minimal HTTP endpoint serving ``render_openmetrics`` on ``GET /metrics``.
 
-async def async_main(host: str, port: int) -> int:
+    It only reads counters that are already maintained, so scraping never
+    triggers a WinRT refresh. Rendering is synchronous and cheap, and it
+    shares the daemon's event loop.
+    """
+
+    CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+    # Bounds on one request head, so a client trickling headers can neither
+    # hold a handler open nor make the shared event loop buffer without limit.
+    MAX_HEADERS = 100
+    MAX_HEAD_BYTES = 8192
+    READ_TIMEOUT_SECONDS = 5.0
+
+    def __init__(self, source: Callable[[], Dict[str, object]], host: str, port: int) -> None:
+        self.source = source
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port, limit=self.MAX_HEAD_BYTES
+        )
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/metrics"
+
+    async def close(self) -> None:
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+
+    async def _read_head(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        """Read the request line and skip the headers; ``None`` when the head
+        exceeds ``MAX_HEADERS`` or ``MAX_HEAD_BYTES``."""
+        try:
+            request_line = await reader.readline()
+            size = len(request_line)
+            # Headers are irrelevant here; skip them up to the blank line.
+            for _ in range(self.MAX_HEADERS + 1):
+                header = await reader.readline()
+                size += len(header)
+                if size > self.MAX_HEAD_BYTES:
+                    return None
+                if header in (b"\r\n", b"\n", b""):
+                    return request_line
+        except ValueError:
+            # A single line longer than the stream limit.
+            return None
+        return None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(
+                self._read_head(reader), timeout=self.READ_TIMEOUT_SECONDS
+            )
+            parts = request_line.decode("latin-1").split() if request_line else []
+            method = parts[0] if parts else ""
+            path = parts[1].split("?", 1)[0] if len(parts) > 1 else ""
+            if request_line is None:
+                status, content_type = (
+                    "431 Request Header Fields Too Large",
+                    "text/plain; charset=utf-8",
+                )
+                body = b"Request header fields too large\n"
+            elif method in ("GET", "HEAD") and path == "/metrics":
+                status, content_type = "200 OK", self.CONTENT_TYPE
+                body = render_openmetrics(self.source()).encode("utf-8")
+            else:
+                status, content_type = "404 Not Found", "text/plain; charset=utf-8"
+                body = b"Not found\n"
+            head = (
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+            ).encode("latin-1")
+            writer.write(head if method == "HEAD" else head + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception:
+            LOGGER.exception("Metrics request failed")
+        finally:
+            writer.close()
+
+
+async def async_main(
+    host: str,
+    port: int,
+    max_cache: int = 200,
+    poll_interval_ms: float = 1500.0,
+    coalesce_window_ms: float = 50.0,
+    poll_floor_ms: float = 250.0,
+    poll_ceiling_ms: float = 10000.0,
+    subscriber_queue_size: int = 256,
+    slow_consumer_policy: str = "drop_oldest",
+    journal_dir: Optional[str] = None,
+    journal_fsync_ms: float = 1000.0,
+    journal_segment_bytes: int = 4 * 1024 * 1024,
+    journal_max_segments: int = 8,
+    compression_threshold_bytes: int = 1024,
+    compression_level: int = 6,
+    tcp_enabled: bool = True,
+    unix_paths: Sequence[str] = (),
+    pipe_names: Sequence[str] = (),
+    max_in_flight_requests: int = 32,
+    read_refresh_min_age_ms: float = 0.0,
+    metrics_port: Optional[int] = None,
+    metrics_host: str = "127.0.0.1",
+    profile: bool = False,
+    profile_dir: str = ".",
+) -> int:
     loop = asyncio.get_running_loop()
-    collector = NotificationCollector(loop=loop)
-    bridge = TcpBridgeServer(host=host, port=port, collector=collector)
+    journal = None
+    if journal_dir:
+        journal = NotificationJournal(
+            journal_dir,
+            segment_bytes=journal_segment_bytes,
+            max_segments=journal_max_segments,
+        )
+    collector = NotificationCollector(
+        loop=loop,
+        max_cache=max(max_cache, 1),
+        poll_interval_seconds=max(poll_interval_ms, 1.0) / 1000.0,
+        profiler=PhaseProfiler(enabled=profile, output_dir=profile_dir),
+        coalesce_window_seconds=max(coalesce_window_ms, 0.0) / 1000.0,
+        poll_floor_seconds=max(poll_floor_ms, 1.0) / 1000.0,
+        poll_ceiling_seconds=max(poll_ceiling_ms, poll_floor_ms, 1.0) / 1000.0,
+        journal=journal,
+        journal_flush_interval_seconds=max(journal_fsync_ms, 10.0) / 1000.0,
+    )
+    cursor_store = ConsumerCursorStore(
+        os.path.join(journal_dir, "consumers.json") if journal_dir else None
+    )
+    cursor_store.load()
+    bridge = TcpBridgeServer(
+        host=host,
+        port=port,
+        collector=collector,
+        subscriber_queue_size=max(subscriber_queue_size, 1),
+        slow_consumer_policy=slow_consumer_policy,
+        cursor_store=cursor_store,
+        compression_threshold_bytes=max(compression_threshold_bytes, 0),
+        compression_level=min(max(compression_level, 0), 9),
+        tcp_enabled=tcp_enabled,
+        unix_paths=unix_paths,
+        pipe_names=pipe_names,
+        max_in_flight_requests=max_in_flight_requests,
+        read_refresh_min_age_seconds=max(read_refresh_min_age_ms, 0.0) / 1000.0,
+    )
     collector.set_snapshot_callback(bridge.broadcast_notifications)
-    await collector.start()
+    exporter = None
+    if metrics_port is not None:
+        exporter = OpenMetricsExporter(bridge.stats, metrics_host, metrics_port)
+        LOGGER.info("Serving OpenMetrics on %s", await exporter.start())
+    if journal is None:
+        await collector.start()
+        start_task = None
+    else:
+        # Serve the journal-warmed snapshot while WinRT is still starting.
+        await collector.open_journal()
+        start_task = asyncio.create_task(collector.start())
 
     try:
         await bridge.run()
         return 0
     finally:
+        if start_task is not None and not start_task.done():
+            start_task.cancel()
+            try:
+                await start_task
+            except asyncio.CancelledError:
+                pass
+        if exporter is not None:
+            await exporter.close()
         await collector.stop()
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    config_parser = argparse.ArgumentParser(add_help=False)
+    config_parser.add_argument("--config")
+    config_args, _ = config_parser.parse_known_args(argv)
+
     parser = argparse.ArgumentParser(description="Windows notifications daemon")
+    parser.add_argument(
+        "--config",
+        default=None,
+        help="JSON file of runtime settings (as accepted by configure); flags override it.",
+    )
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", type=int, default=8765)
-    parser.add_argument("--log-level", default="INFO")
-    return parser.parse_args()
+    parser.add_argument(
+        "--no-tcp",
+        action="store_true",
+        help="Do not listen on --host/--port; requires --unix-socket or --named-pipe.",
+    )
+    parser.add_argument(
+        "--unix-socket",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="Also listen on this AF_UNIX socket path (repeatable).",
+    )
+    parser.add_argument(
+        "--named-pipe",
+        action="append",
+        default=[],
+        metavar="NAME",
+        help="Also listen on this Windows named pipe, e.g. \\\\.\\pipe\\notifications (repeatable).",
+    )
+    parser.add_argument("--log-level", default="INFO", type=str.upper, choices=LOG_LEVELS)
+    parser.add_argument(
+        "--max-cache",
+        type=int,
+        default=200,
+        help="Number of newest notifications kept in the snapshot.",
+    )
+    parser.add_argument(
+        "--poll-interval-ms",
+        type=float,
+        default=1500.0,
+        help="Base fallback poll interval, restored after every read_notifications.",
+    )
+    parser.add_argument(
+        "--refresh-coalesce-ms",
+        type=float,
+        default=50.0,
+        help="Window for collapsing bursts of notification-changed events into one refresh.",
+    )
+    parser.add_argument(
+        "--poll-floor-ms",
+        type=float,
+        default=250.0,
+        help="Shortest fallback poll interval, used right after a change is detected.",
+    )
+    parser.add_argument(
+        "--poll-ceiling-ms",
+        type=float,
+        default=10000.0,
+        help="Longest fallback poll interval reached by backing off on unchanged snapshots.",
+    )
+    parser.add_argument(
+        "--subscriber-queue-size",
+        type=int,
+        default=256,
+        help="Maximum push frames queued per subscriber before the slow-consumer policy applies.",
+    )
+    parser.add_argument(
+        "--slow-consumer-policy",
+        choices=SLOW_CONSUMER_POLICIES,
+        default="drop_oldest",
+        help="What to do when a subscriber's queue is full.",
+    )
+    parser.add_argument(
+        "--max-in-flight-requests",
+        type=int,
+        default=32,
+        help="Concurrent read_notifications requests per connection before reading pauses.",
+    )
+    parser.add_argument(
+        "--read-refresh-min-age-ms",
+        type=float,
+        default=0.0,
+        help=(
+            "In fallback mode, serve read_notifications from the cached snapshot "
+            "if a read-triggered refresh completed within this many milliseconds."
+        ),
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve OpenMetrics text at http://<metrics-host>:<port>/metrics; disabled when omitted.",
+    )
+    parser.add_argument(
+        "--metrics-host",
+        default="127.0.0.1",
+        help="Interface for --metrics-port.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time refresh phases with spans and allow profile requests over IPC.",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=".",
+        help="Directory for files written by profile requests.",
+    )
+    parser.add_argument(
+        "--journal-dir",
+        default=None,
+        help="Directory for the persistent notification journal; disabled when omitted.",
+    )
+    parser.add_argument(
+        "--journal-fsync-ms",
+        type=float,
+        default=1000.0,
+        help="How often buffered journal entries are written and flushed to disk.",
+    )
+    parser.add_argument(
+        "--journal-segment-bytes",
+        type=int,
+        default=4 * 1024 * 1024,
+        help="Size of each preallocated journal segment file.",
+    )
+    parser.add_argument(
+        "--journal-max-segments",
+        type=int,
+        default=8,
+        help="Number of journal segments kept; older segments are deleted on rotation.",
+    )
+    parser.add_argument(
+        "--compression-threshold-bytes",
+        type=int,
+        default=1024,
+        help="Smallest frame payload compressed for clients that negotiated zlib.",
+    )
+    parser.add_argument(
+        "--compression-level",
+        type=int,
+        default=6,
+        help="zlib level (0-9) for negotiated frame compression.",
+    )
+    if config_args.config:
+        try:
+            parser.set_defaults(**load_config_file(config_args.config))
+        except (OSError, ValueError) as error:
+            parser.error(f"invalid --config file {config_args.config}: {error}")
+    return parser.parse_args(argv)
 
 
 def main() -> int:
@@ -1313,7 +5145,34 @@ def main() -> int:
         signal.signal(signal.SIGINT, signal.SIG_DFL)
 
     try:
-        return asyncio.run(async_main(args.host, args.port))
+        return asyncio.run(
+            async_main(
+                args.host,
+                args.port,
+                max_cache=args.max_cache,
+                poll_interval_ms=args.poll_interval_ms,
+                coalesce_window_ms=args.refresh_coalesce_ms,
+                poll_floor_ms=args.poll_floor_ms,
+                poll_ceiling_ms=args.poll_ceiling_ms,
+                subscriber_queue_size=args.subscriber_queue_size,
+                slow_consumer_policy=args.slow_consumer_policy,
+                journal_dir=args.journal_dir,
+                journal_fsync_ms=args.journal_fsync_ms,
+                journal_segment_bytes=args.journal_segment_bytes,
+                journal_max_segments=args.journal_max_segments,
+                compression_threshold_bytes=args.compression_threshold_bytes,
+                compression_level=args.compression_level,
+                tcp_enabled=not args.no_tcp,
+                unix_paths=args.unix_socket,
+                pipe_names=args.named_pipe,
+                max_in_flight_requests=args.max_in_flight_requests,
+                read_refresh_min_age_ms=args.read_refresh_min_age_ms,
+                metrics_port=args.metrics_port,
+                metrics_host=args.metrics_host,
+                profile=args.profile,
+                profile_dir=args.profile_dir,
+            )
+        )
     except KeyboardInterrupt:
         return 0
 
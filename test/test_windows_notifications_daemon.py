@@ -1,16 +1,49 @@
 import asyncio
+import base64
+import dataclasses
+import hashlib
 import json
+import os
+import pstats
+import socket
 import sys
+import tempfile
+import threading
+import time
 import types
 import typing
 import unittest
+import unittest.mock
+import zlib
 
 from bridge.windows_notifications_daemon import (
+    FRAME_FLAG_MSGPACK,
+    FRAME_FLAG_ZLIB,
+    FRAME_HEADER,
+    Histogram,
+    AdaptivePollInterval,
+    ConsumerCursorStore,
     NotificationCollector,
+    NotificationFilter,
+    NotificationJournal,
     NotificationRecord,
+    NotificationSnapshot,
+    OpenMetricsExporter,
+    PhaseProfiler,
+    SubscriberChannel,
     TcpBridgeServer,
+    _encode_frame,
+    _newest_records,
+    extract_hatched_nickname,
+    normalize_nickname,
+    parse_args,
 )
 
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
 
 class _AllowedStatus:
     name = "ALLOWED"
@@ -63,8 +96,8 @@ class _FailingPushListener(_FakeListener):
 
 
 class _CollectorWithPushRegistrationFailure(NotificationCollector):
-    def __init__(self, loop):
-        super().__init__(loop)
+    def __init__(self, loop, **kwargs):
+        super().__init__(loop, **kwargs)
         self.listener = _FailingPushListener()
         self.refresh_calls = 0
 
@@ -97,6 +130,19 @@ class _CollectorWithFallbackPollCounter(_CollectorWithPushRegistrationFailure):
         self._poll_interval_seconds = 0.01
 
 
+class _CollectorWithScriptedPollResults(_CollectorWithPushRegistrationFailure):
+    def __init__(self, loop, results):
+        super().__init__(loop, poll_floor_seconds=0.01, poll_ceiling_seconds=0.08)
+        self._poll_interval_seconds = 0.02
+        self._results = list(results)
+        self.observed_intervals = []
+
+    async def refresh_snapshot(self):
+        self.refresh_calls += 1
+        self.observed_intervals.append(self._poll_interval.current_seconds)
+        return self._results.pop(0) if self._results else False
+
+
 class _CollectorWithSlowRefreshAndFallback(_CollectorWithPushRegistrationFailure):
     def __init__(self, loop):
         super().__init__(loop)
@@ -109,6 +155,23 @@ class _CollectorWithSlowRefreshAndFallback(_CollectorWithPushRegistrationFailure
         await asyncio.sleep(0.1)
 
 
+class _CollectorWithSlowRefreshCounter(NotificationCollector):
+    def __init__(self, loop):
+        super().__init__(loop, coalesce_window_seconds=0.01)
+        self.refresh_calls = 0
+        self.active_refresh_calls = 0
+        self.max_active_refresh_calls = 0
+
+    async def refresh_snapshot(self):
+        self.refresh_calls += 1
+        self.active_refresh_calls += 1
+        self.max_active_refresh_calls = max(
+            self.max_active_refresh_calls, self.active_refresh_calls
+        )
+        await asyncio.sleep(0.05)
+        self.active_refresh_calls -= 1
+
+
 class _CollectorWithActivePush(NotificationCollector):
     def __init__(self, loop):
         super().__init__(loop)
@@ -118,28 +181,40 @@ class _CollectorWithActivePush(NotificationCollector):
 class _CollectorWithFallbackRefreshSequence(_CollectorWithPushRegistrationFailure):
     async def refresh_snapshot(self):
         self.refresh_calls += 1
-        with self._lock:
-            self._cache = [
-                NotificationRecord(
-                    timestamp=None,
-                    title=f"Title {self.refresh_calls}",
-                    body=f"Body {self.refresh_calls}",
-                    app="TestApp",
-                )
-            ]
+        self._cache = [
+            NotificationRecord(
+                timestamp=None,
+                title=f"Title {self.refresh_calls}",
+                body=f"Body {self.refresh_calls}",
+                app="TestApp",
+            )
+        ]
 
 
 class _CollectorWithRefreshFailure:
     def __init__(self):
         self.refresh_calls = 0
+        self.refresh_completed_at = None
 
     def is_push_subscription_active(self):
         return False
 
+    def note_read_request(self):
+        pass
+
+    def poll_stats(self):
+        return {}
+
     async def refresh_snapshot(self):
         self.refresh_calls += 1
         raise RuntimeError("refresh crash")
 
+    def refresh_in_flight(self):
+        return None
+
+    def shared_refresh(self):
+        return asyncio.ensure_future(self.refresh_snapshot())
+
     def read(self):
         return {
             "ok": True,
@@ -157,6 +232,41 @@ class _CollectorWithRefreshFailure:
         }
 
 
+class _RecordingWriter:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, data):
+        for line in data.decode("utf-8").splitlines():
+            self.frames.append(json.loads(line))
+
+    async def drain(self):
+        return None
+
+
+class _BlockedWriter(_RecordingWriter):
+    def __init__(self):
+        super().__init__()
+        self.unblock = asyncio.Event()
+        self.closed = False
+
+    async def drain(self):
+        await self.unblock.wait()
+
+    def close(self):
+        self.closed = True
+
+
+def _notification_payload(notification_id, title):
+    return NotificationRecord(
+        timestamp=None,
+        title=title,
+        body=None,
+        app="TestApp",
+        notification_id=notification_id,
+    ).to_json()
+
+
 class _FakeTextElement:
     def __init__(self, text):
         self.text = text
@@ -203,6 +313,33 @@ class _FakeItem:
         self.app_info = None
 
 
+class _FakeItemWithId(_FakeItem):
+    def __init__(self, notification_id, *texts):
+        super().__init__(_FakeVisualShapeA(_FakeBindingWithTextElements(*texts)))
+        self.id = notification_id
+
+
+class _CollectorCountingMaps(NotificationCollector):
+    def __init__(self, loop):
+        super().__init__(loop)
+        self.mapped_ids = []
+
+    def _map_notification(self, item):
+        self.mapped_ids.append(getattr(item, "id", None))
+        return super()._map_notification(item)
+
+
+class _CollectorWithBlockingMap(NotificationCollector):
+    def __init__(self, loop):
+        super().__init__(loop)
+        self.mapping_threads = set()
+
+    def _map_notification(self, item):
+        self.mapping_threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        return super()._map_notification(item)
+
+
 class _SnapshotListener:
     def __init__(self, notifications):
         self._notifications = notifications
@@ -211,6 +348,30 @@ class _SnapshotListener:
         return list(self._notifications)
 
 
+class _TargetedListener(_SnapshotListener):
+    def __init__(self, notifications):
+        super().__init__(notifications)
+        self.full_fetches = 0
+        self.single_fetches = []
+
+    async def get_notifications_async(self, kind):
+        self.full_fetches += 1
+        return await super().get_notifications_async(kind)
+
+    def get_notification(self, notification_id):
+        self.single_fetches.append(notification_id)
+        for item in self._notifications:
+            if item.id == notification_id:
+                return item
+        return None
+
+
+class _ChangedEventArgs:
+    def __init__(self, change_kind, notification_id):
+        self.change_kind = types.SimpleNamespace(name=change_kind)
+        self.user_notification_id = notification_id
+
+
 class NotificationCollectorFallbackTests(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self._modules_backup = {
@@ -353,6 +514,56 @@ class NotificationCollectorFallbackTests(unittest.IsolatedAsyncioTestCase):
         self.assertGreaterEqual(collector.refresh_calls, 2)
         await collector.stop()
 
+    def test_adaptive_poll_interval_tightens_backs_off_and_resets(self):
+        interval = AdaptivePollInterval(
+            base_seconds=1.5, floor_seconds=0.25, ceiling_seconds=5.0
+        )
+
+        interval.record_miss()
+        self.assertEqual(interval.current_seconds, 3.0)
+        interval.record_miss()
+        interval.record_miss()
+        self.assertEqual(interval.current_seconds, 5.0)
+        interval.record_hit()
+        self.assertEqual(interval.current_seconds, 0.25)
+        interval.reset()
+        self.assertEqual(interval.current_seconds, 1.5)
+        self.assertEqual(
+            interval.stats(),
+            {
+                "intervalSeconds": 1.5,
+                "floorSeconds": 0.25,
+                "ceilingSeconds": 5.0,
+                "hits": 1,
+                "misses": 3,
+                "resets": 1,
+            },
+        )
+
+    async def test_fallback_poll_interval_adapts_and_resets_on_read(self):
+        collector = _CollectorWithScriptedPollResults(
+            asyncio.get_running_loop(), [False, False, False, True]
+        )
+
+        await collector.start()
+        await asyncio.sleep(0.3)
+
+        # Intervals are recorded before the poll result is applied.
+        self.assertEqual(collector.observed_intervals[1:4], [0.02, 0.04, 0.08])
+        self.assertGreaterEqual(len(collector.observed_intervals), 5)
+        self.assertEqual(collector.observed_intervals[4], 0.01)
+
+        bridge = TcpBridgeServer("127.0.0.1", 8765, collector)
+        response = await bridge._handle_message(
+            json.dumps({"id": "8", "type": "read_notifications"}).encode("utf-8"),
+            object(),
+        )
+        await collector.stop()
+
+        self.assertEqual(response["poll"]["resets"], 1)
+        self.assertEqual(response["poll"]["hits"], 1)
+        self.assertGreaterEqual(response["poll"]["misses"], 2)
+
     async def test_stop_cancels_fallback_poll_task(self):
         collector = _CollectorWithSlowRefreshAndFallback(asyncio.get_running_loop())
 
@@ -452,8 +663,7 @@ class NotificationCollectorFallbackTests(unittest.IsolatedAsyncioTestCase):
 
         await collector.refresh_snapshot()
 
-        with collector._lock:
-            cache_snapshot = list(collector._cache)
+        cache_snapshot = list(collector._cache)
 
         self.assertEqual(len(cache_snapshot), 2)
         self.assertEqual(cache_snapshot[0].title, "Title B1")
@@ -461,6 +671,1383 @@ class NotificationCollectorFallbackTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(cache_snapshot[1].title, "Title B2")
         self.assertEqual(cache_snapshot[1].body, "Egg: Dog\nRarity: Rare\nSerial: #2")
 
+    async def test_refresh_snapshot_maps_only_unseen_ids_and_evicts_missing(self):
+        collector = _CollectorCountingMaps(asyncio.get_running_loop())
+        collector._notification_kind_toast = 1
+        first = _FakeItemWithId(1, "Title 1", "Body 1")
+        second = _FakeItemWithId(2, "Title 2", "Body 2")
+        collector._listener = _SnapshotListener([first, second])
+
+        await collector.refresh_snapshot()
+        self.assertEqual(collector.mapped_ids, [1, 2])
+
+        third = _FakeItemWithId(3, "Title 3", "Body 3")
+        collector._listener = _SnapshotListener([second, third])
+        await collector.refresh_snapshot()
+
+        self.assertEqual(collector.mapped_ids, [1, 2, 3])
+        self.assertEqual(set(collector._records_by_id), {2, 3})
+        titles = sorted(item.title for item in collector._cache)
+        self.assertEqual(titles, ["Title 2", "Title 3"])
+
+    async def test_delta_subscribers_receive_added_and_removed_frames(self):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        collector._available = True
+        collector._cache = [
+            NotificationRecord(
+                timestamp=None,
+                title="Title 1",
+                body=None,
+                app="TestApp",
+                notification_id=1,
+            )
+        ]
+        bridge = TcpBridgeServer("127.0.0.1", 8765, collector)
+        delta_writer = _RecordingWriter()
+        full_writer = _RecordingWriter()
+
+        response = await bridge._handle_message(
+            json.dumps(
+                {"id": "6", "type": "subscribe_notifications", "mode": "delta"}
+            ).encode("utf-8"),
+            delta_writer,
+        )
+        await bridge._handle_message(
+            json.dumps({"id": "7", "type": "subscribe_notifications"}).encode("utf-8"),
+            full_writer,
+        )
+
+        self.assertEqual(response["mode"], "delta")
+        self.assertEqual(response["seq"], 0)
+        self.assertEqual(response["notifications"][0]["notificationId"], 1)
+
+        await bridge.broadcast_notifications(
+            [_notification_payload(2, "Title 2"), _notification_payload(1, "Title 1")]
+        )
+        await bridge.broadcast_notifications([_notification_payload(2, "Title 2")])
+        await bridge.flush_subscribers()
+
+        self.assertEqual(
+            [(frame["seq"], frame["baseSeq"]) for frame in delta_writer.frames],
+            [(1, 0), (2, 1)],
+        )
+        self.assertEqual(
+            [item["notificationId"] for item in delta_writer.frames[0]["added"]], [2]
+        )
+        self.assertEqual(delta_writer.frames[0]["removed"], [])
+        self.assertEqual(delta_writer.frames[1]["added"], [])
+        self.assertEqual(delta_writer.frames[1]["removed"], [1])
+        self.assertEqual(
+            [frame["type"] for frame in full_writer.frames],
+            ["notifications", "notifications"],
+        )
+        self.assertEqual(len(full_writer.frames[0]["notifications"]), 2)
+
+    async def test_filtered_subscribers_only_receive_matching_records(self):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        collector._available = True
+        collector._cache = [
+            NotificationRecord(
+                timestamp="2024-01-01T00:00:00.000000Z",
+                title="Rex hatched",
+                body=None,
+                app="Game",
+                notification_id=1,
+            ),
+            NotificationRecord(
+                timestamp="2024-01-01T00:00:00.000000Z",
+                title="Mail",
+                body=None,
+                app="Outlook",
+                notification_id=2,
+            ),
+        ]
+        bridge = TcpBridgeServer("127.0.0.1", 8765, collector)
+        game_filter = {"apps": ["game"], "titleRegex": "hatched$"}
+
+        read = await bridge._handle_message(
+            json.dumps(
+                {"id": "r", "type": "read_notifications", "filter": game_filter}
+            ).encode("utf-8"),
+            _RecordingWriter(),
+        )
+        self.assertEqual([item["notificationId"] for item in read["notifications"]], [1])
+
+        invalid = await bridge._handle_message(
+            json.dumps(
+                {"id": "x", "type": "subscribe_notifications", "filter": {"titleRegex": "("}}
+            ).encode("utf-8"),
+            _RecordingWriter(),
+        )
+        self.assertFalse(invalid["ok"])
+        self.assertIn("Invalid filter", invalid["message"])
+
+        delta_writer = _RecordingWriter()
+        full_writer = _RecordingWriter()
+        response = await bridge._handle_message(
+            json.dumps(
+                {
+                    "id": "d",
+                    "type": "subscribe_notifications",
+                    "mode": "delta",
+                    "filter": game_filter,
+                }
+            ).encode("utf-8"),
+            delta_writer,
+        )
+        await bridge._handle_message(
+            json.dumps(
+                {"id": "f", "type": "subscribe_notifications", "filter": game_filter}
+            ).encode("utf-8"),
+            full_writer,
+        )
+        self.assertEqual(
+            [item["notificationId"] for item in response["notifications"]], [1]
+        )
+
+        def payload(notification_id, title, app):
+            return NotificationRecord(
+                timestamp="2024-01-01T00:00:00.000000Z",
+                title=title,
+                body=None,
+                app=app,
+                notification_id=notification_id,
+            ).to_json()
+
+        base = [payload(1, "Rex hatched", "Game"), payload(2, "Mail", "Outlook")]
+        await bridge.broadcast_notifications(base + [payload(3, "Spam", "Outlook")])
+        await asyncio.sleep(0)
+        await bridge.broadcast_notifications(base + [payload(4, "Ann hatched", "Game")])
+        await bridge.flush_subscribers()
+
+        self.assertEqual(len(delta_writer.frames), 1)
+        self.assertEqual(
+            (delta_writer.frames[0]["seq"], delta_writer.frames[0]["baseSeq"]), (2, 0)
+        )
+        self.assertEqual(
+            [item["notificationId"] for item in delta_writer.frames[0]["added"]], [4]
+        )
+        self.assertEqual(
+            [
+                [item["notificationId"] for item in frame["notifications"]]
+                for frame in full_writer.frames
+            ],
+            [[1], [1, 4]],
+        )
+
+    def test_hatched_nickname_extraction_matches_node_matcher(self):
+        cases = {
+            "🔥 Congrats! :flag_cz: senpaicat22 hatched a Huge Dog": "senpaicat22",
+            "🇨🇿 senpaicat22 hatched a Huge Dog": "senpaicat22",
+            "senpaicat22, hatched a Huge Dog": "senpaicat22",
+            "🔥 Congrats! senpaicat22!!! hatched a Huge Dog": "senpaicat22",
+            ":flag_cz:\nsenpaicat22\nhatched a Huge Dog\nwith bonus roll": "senpaicat22",
+            "🔥 Congrats! Cool Display hatched a Huge Dog": "cool display",
+            "!!!Žluťoučký!!! hatched a cat": "žluťoučký",
+            "a hatchedb hatched c": "a hatchedb",
+            "😀 hatched": None,
+            "xhatched y": None,
+        }
+        for text, expected in cases.items():
+            self.assertEqual(extract_hatched_nickname(text), expected, text)
+        self.assertEqual(normalize_nickname("  ~~Bob_1!! "), "bob_1")
+
+        record = NotificationRecord(
+            timestamp=None,
+            title="Pet Simulator",
+            body="Rex hatched a Huge Dog",
+            app="Game",
+        )
+        self.assertEqual(
+            NotificationRecord.from_json(
+                {key: value for key, value in record.to_json().items() if key != "hatchedNickname"}
+            ).hatched_nickname,
+            "rex",
+        )
+
+    async def test_signature_matches_forward_normalization_and_dedups_snapshot(self):
+        record = NotificationRecord(
+            timestamp="2024-01-01T00:00:00.000000Z",
+            title="  Rex hatched\ufeff",
+            body="   ",
+            app=" ",
+        )
+        expected = hashlib.blake2b(
+            "2024-01-01T00:00:00.000000Z|Unknown app|Rex hatched|".encode("utf-8"),
+            digest_size=8,
+        ).hexdigest()
+        self.assertEqual(record.signature, expected)
+        self.assertEqual(record.to_json()["signature"], expected)
+
+        collector = NotificationCollector(asyncio.get_running_loop())
+        duplicate = NotificationRecord(
+            timestamp="2024-01-01T00:00:00.000000Z",
+            title="Rex hatched",
+            body=None,
+            app=None,
+            notification_id=7,
+        )
+        newer = NotificationRecord(
+            timestamp="2024-01-02T00:00:00.000000Z", title="Later", body=None, app="App"
+        )
+        await collector._publish_snapshot([record, newer, duplicate])
+        self.assertEqual([item.title for item in collector._cache], ["Later", record.title])
+
+    async def test_nickname_roster_filters_subscribers_and_reads(self):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        collector._available = True
+        collector._notification_kind_toast = 1
+        collector._listener = _SnapshotListener(
+            [
+                _FakeItemWithId(1, "Game", "🔥 Congrats! Rex hatched a Huge Dog"),
+                _FakeItemWithId(2, "Game", "Ann hatched a Cat"),
+                _FakeItemWithId(3, "Mail", "Meeting at 10"),
+            ]
+        )
+        await collector.refresh_snapshot()
+        self.assertEqual(
+            [item.hatched_nickname for item in collector._cache], ["rex", "ann", None]
+        )
+        bridge = TcpBridgeServer("127.0.0.1", 8765, collector)
+        writer = _RecordingWriter()
+        await bridge._handle_message(
+            json.dumps(
+                {"id": "s", "type": "subscribe_notifications", "filter": {"roster": True}}
+            ).encode("utf-8"),
+            writer,
+        )
+
+        response = await bridge._handle_message(
+            json.dumps(
+                {"id": "n", "type": "set_nickname_roster", "nicknames": [" ANN! ", "Zed"]}
+            ).encode("utf-8"),
+            writer,
+        )
+        self.assertEqual((response["rosterSize"], response["matched"]), (2, 1))
+        await bridge.flush_subscribers()
+        self.assertEqual(
+            [
+                (item["notificationId"], item["hatchedNickname"])
+                for item in writer.frames[-1]["notifications"]
+            ],
+            [(2, "ann")],
+        )
+
+        read = await bridge._handle_message(
+            json.dumps(
+                {"id": "r", "type": "read_notifications", "filter": {"roster": True}}
+            ).encode("utf-8"),
+            writer,
+        )
+        self.assertEqual([item["notificationId"] for item in read["notifications"]], [2])
+
+        # Broadcast fan-out picks roster records through the nickname index
+        # instead of testing every record.
+        collector.set_snapshot_callback(bridge.broadcast_notifications)
+        collector._listener._notifications.append(
+            _FakeItemWithId(4, "Game", "Zed hatched a Bird")
+        )
+        with unittest.mock.patch.object(
+            NotificationFilter, "matches", side_effect=AssertionError("linear scan")
+        ):
+            await collector.refresh_snapshot()
+        await bridge.flush_subscribers()
+        self.assertEqual(
+            [item["notificationId"] for item in writer.frames[-1]["notifications"]],
+            [2, 4],
+        )
+
+    async def _open_bridge_connection(self, bridge):
+        server = await asyncio.start_server(bridge.handle_client, "127.0.0.1", 0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        self.addCleanup(writer.close)
+        return reader, writer
+
+    async def _hello_then_read(self, encoding):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        collector._available = True
+        collector._cache = [
+            NotificationRecord(
+                timestamp=None, title="Ahoj 🇨🇿", body="tělo", app="App", notification_id=1
+            )
+        ]
+        bridge = TcpBridgeServer("127.0.0.1", 0, collector)
+        reader, writer = await self._open_bridge_connection(bridge)
+
+        hello = {
+            "id": "h",
+            "type": "hello",
+            "protocolVersion": 2,
+            "framing": "length-prefixed",
+            "encoding": encoding,
+        }
+        writer.write(json.dumps(hello).encode("utf-8") + b"\n")
+        reply = json.loads(await reader.readline())
+        self.assertEqual(reply["framing"], "length-prefixed")
+        self.assertEqual(reply["encoding"], encoding)
+        self.assertIn("length_prefixed_framing", reply["features"])
+
+        request = json.dumps({"id": "r", "type": "read_notifications"}).encode("utf-8")
+        writer.write(FRAME_HEADER.pack(len(request), 0) + request)
+        length, flags = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+        return flags, await reader.readexactly(length)
+
+    async def test_hello_negotiates_length_prefixed_json_framing(self):
+        flags, payload = await self._hello_then_read("json")
+
+        self.assertEqual(flags, 0)
+        response = json.loads(payload)
+        self.assertEqual(response["id"], "r")
+        self.assertEqual(response["notifications"][0]["title"], "Ahoj 🇨🇿")
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    async def test_hello_negotiates_length_prefixed_msgpack_framing(self):
+        flags, payload = await self._hello_then_read("msgpack")
+
+        self.assertEqual(flags, FRAME_FLAG_MSGPACK)
+        response = msgpack.unpackb(payload, raw=False)
+        self.assertEqual(response["notifications"][0]["body"], "tělo")
+
+    async def test_hello_negotiates_zlib_compression_above_threshold(self):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        collector._available = True
+        collector._cache = [
+            NotificationRecord(
+                timestamp=None,
+                title=f"Title {index}",
+                body="Body text " * 8,
+                app="App",
+                notification_id=index,
+            )
+            for index in range(40)
+        ]
+        bridge = TcpBridgeServer(
+            "127.0.0.1", 0, collector, compression_threshold_bytes=256
+        )
+        reader, writer = await self._open_bridge_connection(bridge)
+
+        hello = {
+            "id": "h",
+            "type": "hello",
+            "framing": "length-prefixed",
+            "compression": "zlib",
+        }
+        writer.write(json.dumps(hello).encode("utf-8") + b"\n")
+        reply = json.loads(await reader.readline())
+        self.assertEqual(reply["compression"], "zlib")
+        self.assertEqual(reply["compressionThresholdBytes"], 256)
+        dictionary = base64.b64decode(reply["compressionDictionary"])
+
+        async def request(message):
+            payload = json.dumps(message).encode("utf-8")
+            writer.write(FRAME_HEADER.pack(len(payload), 0) + payload)
+            length, flags = FRAME_HEADER.unpack(
+                await reader.readexactly(FRAME_HEADER.size)
+            )
+            return flags, await reader.readexactly(length)
+
+        flags, payload = await request({"id": "p", "type": "ping"})
+        self.assertEqual(flags, 0)
+        self.assertEqual(json.loads(payload)["type"], "pong")
+
+        flags, payload = await request({"id": "r", "type": "read_notifications"})
+        self.assertEqual(flags, FRAME_FLAG_ZLIB)
+        decompressor = zlib.decompressobj(zdict=dictionary)
+        response = json.loads(decompressor.decompress(payload))
+        self.assertEqual(len(response["notifications"]), 40)
+
+        stats = bridge.compression_stats()
+        self.assertEqual(stats["compressedFrames"], 1)
+        self.assertEqual(stats["skippedFrames"], 1)
+        self.assertLess(stats["ratio"], 0.5)
+
+    async def test_clients_without_hello_keep_ndjson(self):
+        bridge = TcpBridgeServer(
+            "127.0.0.1", 0, _CollectorWithActivePush(asyncio.get_running_loop())
+        )
+        reader, writer = await self._open_bridge_connection(bridge)
+
+        writer.write(b'{"id": "p", "type": "ping"}\n')
+
+        self.assertEqual(
+            json.loads(await reader.readline()), {"id": "p", "ok": True, "type": "pong"}
+        )
+
+    @unittest.skipUnless(hasattr(asyncio, "start_unix_server"), "AF_UNIX is unavailable")
+    async def test_unix_socket_listener_serves_same_protocol_as_tcp(self):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        collector._available = True
+        collector._cache = [
+            NotificationRecord(
+                timestamp=None, title="Title", body="Body", app="App", notification_id=1
+            )
+        ]
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "bridge.sock")
+        bridge = TcpBridgeServer(
+            "127.0.0.1", 0, collector, tcp_enabled=False, unix_paths=[path]
+        )
+
+        addresses = await bridge.start_listeners()
+        self.addAsyncCleanup(bridge.close_listeners)
+        self.assertEqual(addresses, [f"unix:{path}"])
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+        reader, writer = await asyncio.open_unix_connection(path)
+        self.addCleanup(writer.close)
+        writer.write(b'{"id": "p", "type": "ping"}\n')
+        self.assertEqual(json.loads(await reader.readline())["type"], "pong")
+        writer.write(b'{"id": "r", "type": "read_notifications"}\n')
+        response = json.loads(await reader.readline())
+        self.assertEqual(response["notifications"][0]["title"], "Title")
+
+        writer.close()
+        await bridge.close_listeners()
+        self.assertFalse(os.path.exists(path))
+
+    async def test_ping_is_answered_while_read_notifications_refresh_is_pending(self):
+        collector = _CollectorWithSlowRefreshCounter(asyncio.get_running_loop())
+        bridge = TcpBridgeServer("127.0.0.1", 0, collector, max_in_flight_requests=2)
+        reader, writer = await self._open_bridge_connection(bridge)
+
+        writer.write(
+            b'{"id": "r1", "type": "read_notifications"}\n'
+            b'{"id": "r2", "type": "read_notifications"}\n'
+            b'{"id": "p", "type": "ping"}\n'
+        )
+        writer.write_eof()
+        replies = [json.loads(line) for line in [await reader.readline() for _ in range(3)]]
+
+        self.assertEqual(replies[0]["id"], "p")
+        self.assertEqual({reply["id"] for reply in replies[1:]}, {"r1", "r2"})
+        self.assertEqual(collector.refresh_calls, 1)
+
+    async def test_half_closed_client_receives_every_pipelined_reply(self):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        collector._available = True
+        collector._cache = [
+            NotificationRecord(
+                timestamp=None,
+                title=f"Title {index}",
+                body="Body " * 150,
+                app="App",
+                notification_id=index,
+            )
+            for index in range(50)
+        ]
+        bridge = TcpBridgeServer("127.0.0.1", 0, collector)
+        server = await asyncio.start_server(bridge.handle_client, "127.0.0.1", 0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        # A small receive buffer makes the replies back up in the channel.
+        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        client.connect(server.sockets[0].getsockname())
+        reader, writer = await asyncio.open_connection(sock=client)
+        self.addCleanup(writer.close)
+
+        for index in range(200):
+            request_type = "read_notifications" if index % 2 else "ping"
+            writer.write(
+                json.dumps({"id": str(index), "type": request_type}).encode("utf-8")
+                + b"\n"
+            )
+        writer.write_eof()
+        # Not reading yet lets the replies back up behind the socket buffer.
+        await asyncio.sleep(0.2)
+        replies = []
+        while True:
+            line = await asyncio.wait_for(reader.readline(), 5)
+            if not line:
+                break
+            replies.append(json.loads(line))
+
+        self.assertEqual(
+            sorted(int(reply["id"]) for reply in replies), list(range(200))
+        )
+
+    async def test_channel_backlog_pauses_writers_until_replies_drain(self):
+        writer = _BlockedWriter()
+        channel = SubscriberChannel(writer, max_backlog_bytes=16)
+        frame = b'{"id": "1", "ok": true}\n'
+
+        delivered = asyncio.create_task(channel.deliver(frame))
+        writable = asyncio.create_task(channel.wait_writable())
+        await asyncio.sleep(0.01)
+        self.assertFalse(delivered.done())
+        self.assertFalse(writable.done())
+        self.assertEqual(channel.stats()["backlogBytes"], len(frame))
+
+        writer.unblock.set()
+        self.assertTrue(await asyncio.wait_for(delivered, 1))
+        await asyncio.wait_for(writable, 1)
+        self.assertEqual(channel.stats()["backlogBytes"], 0)
+        self.assertEqual(writer.frames, [{"id": "1", "ok": True}])
+        channel.close()
+
+    async def test_client_not_reading_replies_bounds_server_backlog(self):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        collector._available = True
+        collector._cache = [
+            NotificationRecord(
+                timestamp=None,
+                title=f"Title {index}",
+                body="Body " * 150,
+                app="App",
+                notification_id=index,
+            )
+            for index in range(50)
+        ]
+        bridge = TcpBridgeServer("127.0.0.1", 0, collector)
+        reader, writer = await self._open_bridge_connection(bridge)
+
+        request = b'{"id": "r", "type": "read_notifications"}\n'
+        writer.write(request * 4000)
+        await asyncio.sleep(0.3)
+
+        (channel,) = bridge._channels.values()
+        reply_bytes = len(channel.codec.encode(collector.read()))
+        self.assertLessEqual(
+            channel.stats()["backlogBytes"],
+            channel.max_backlog_bytes + bridge.max_in_flight_requests * reply_bytes,
+        )
+        self.assertLess(channel.stats()["sentFrames"], 4000)
+
+    async def test_poll_refresh_and_reads_share_one_in_flight_fetch(self):
+        collector = _CollectorWithSlowRefreshCounter(asyncio.get_running_loop())
+        bridge = TcpBridgeServer("127.0.0.1", 0, collector)
+
+        poll = asyncio.create_task(collector._refresh_shared())
+        await asyncio.sleep(0)
+        response = await bridge._handle_message(
+            b'{"id": "r", "type": "read_notifications"}', object()
+        )
+        await poll
+
+        self.assertEqual(response["refresh"], "joined")
+        self.assertEqual(collector.refresh_calls, 1)
+
+        # A change-triggered refresh waits for the running fetch, then starts
+        # its own, so the two never overlap.
+        first = asyncio.create_task(collector._refresh_shared())
+        await asyncio.sleep(0)
+        await collector._refresh_shared(fresh=True)
+        await first
+
+        self.assertEqual(collector.refresh_calls, 3)
+        self.assertEqual(collector.max_active_refresh_calls, 1)
+
+    async def test_concurrent_fallback_reads_share_one_refresh(self):
+        collector = _CollectorWithSlowRefreshCounter(asyncio.get_running_loop())
+        bridge = TcpBridgeServer(
+            "127.0.0.1", 0, collector, read_refresh_min_age_seconds=0.2
+        )
+
+        def read(request_id):
+            return bridge._handle_message(
+                json.dumps({"id": request_id, "type": "read_notifications"}).encode(
+                    "utf-8"
+                ),
+                object(),
+            )
+
+        concurrent = await asyncio.gather(read("a"), read("b"), read("c"))
+        cached = await read("d")
+        await asyncio.sleep(0.25)
+        expired = await read("e")
+
+        self.assertEqual(collector.refresh_calls, 2)
+        self.assertEqual(collector.max_active_refresh_calls, 1)
+        self.assertEqual(
+            [response["refresh"] for response in concurrent], ["fresh", "joined", "joined"]
+        )
+        self.assertEqual(cached["refresh"], "cached")
+        self.assertEqual(expired["refresh"], "fresh")
+        self.assertEqual(
+            bridge.read_refresh_stats(), {"fresh": 2, "joined": 2, "cached": 1}
+        )
+
+    async def test_read_notifications_supports_since_limit_and_if_none_match(self):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        collector._available = True
+        collector._cache = [
+            NotificationRecord(
+                timestamp=f"2024-01-01T00:00:0{index}.000000Z",
+                title=f"Title {index}",
+                body="Body",
+                app="App",
+                notification_id=index,
+                seq=index,
+            )
+            for index in range(5, 0, -1)
+        ]
+        bridge = TcpBridgeServer("127.0.0.1", 0, collector)
+
+        async def read(**fields):
+            return await bridge._handle_message(
+                json.dumps({"id": "r", "type": "read_notifications", **fields}).encode(
+                    "utf-8"
+                ),
+                object(),
+            )
+
+        first = await read(since=1, limit=2)
+        self.assertEqual([item["seq"] for item in first["notifications"]], [3, 2])
+        self.assertTrue(first["hasMore"])
+        second = await read(since=first["nextSince"], limit=2)
+        self.assertEqual([item["seq"] for item in second["notifications"]], [5, 4])
+        self.assertFalse(second["hasMore"])
+        self.assertEqual(second["nextSince"], 5)
+
+        by_time = await read(since="2024-01-01T00:00:03.000000Z")
+        self.assertEqual([item["seq"] for item in by_time["notifications"]], [5, 4])
+        self.assertEqual(by_time["nextSince"], 5)
+        oldest = await read(limit=1)
+        self.assertEqual([item["seq"] for item in oldest["notifications"]], [1])
+        self.assertEqual(oldest["nextSince"], 1)
+
+        unchanged = await read(ifNoneMatch=first["version"])
+        self.assertEqual(
+            unchanged,
+            {"id": "r", "ok": True, "notModified": True, "version": first["version"]},
+        )
+        changed = await read(ifNoneMatch="stale", since=4)
+        self.assertEqual([item["seq"] for item in changed["notifications"]], [5])
+
+        invalid = await read(limit=0)
+        self.assertFalse(invalid["ok"])
+        self.assertIn("Invalid read window", invalid["message"])
+        by_time_paged = await read(since="2024-01-01T00:00:03.000000Z", limit=1)
+        self.assertFalse(by_time_paged["ok"])
+
+    async def test_read_notifications_pages_return_every_record_exactly_once(self):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        collector._available = True
+        # Shared timestamps and a newest-first order that disagrees with seq.
+        collector._cache = [
+            NotificationRecord(
+                timestamp=f"2024-01-01T00:00:0{index // 4}.000000Z",
+                title=f"Title {index}",
+                body="Body",
+                app="App",
+                notification_id=index,
+                seq=(index * 7) % 23 + 1,
+            )
+            for index in range(22, -1, -1)
+        ]
+        bridge = TcpBridgeServer("127.0.0.1", 0, collector)
+
+        async def read(**fields):
+            return await bridge._handle_message(
+                json.dumps({"id": "r", "type": "read_notifications", **fields}).encode(
+                    "utf-8"
+                ),
+                object(),
+            )
+
+        for start in ({}, {"since": 0}, {"since": 5}):
+            for limit in (1, 3, 4, 23, 50):
+                seen = []
+                fields = dict(start, limit=limit)
+                while True:
+                    page = await read(**fields)
+                    seqs = [item["seq"] for item in page["notifications"]]
+                    self.assertLessEqual(len(seqs), limit)
+                    self.assertEqual(seqs, sorted(seqs, reverse=True))
+                    seen.extend(seqs)
+                    if not page["hasMore"]:
+                        break
+                    fields = {"since": page["nextSince"], "limit": limit}
+                first = start.get("since", 0) + 1
+                self.assertEqual(sorted(seen), list(range(first, 24)))
+                self.assertEqual(len(seen), len(set(seen)))
+                self.assertEqual(page["nextSince"], 23)
+
+        by_time = await read(since="2024-01-01T00:00:03.000000Z")
+        timestamps = {item["timestamp"] for item in by_time["notifications"]}
+        self.assertEqual(len(by_time["notifications"]), 7)
+        self.assertTrue(
+            all(timestamp > "2024-01-01T00:00:03.000000Z" for timestamp in timestamps)
+        )
+
+    async def test_configure_validates_and_applies_runtime_settings(self):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        collector._available = True
+        collector._cache = [
+            NotificationRecord(
+                timestamp=f"2024-01-01T00:00:0{index}.000000Z",
+                title=f"Title {index}",
+                body="Body",
+                app="App",
+                notification_id=index,
+            )
+            for index in range(5)
+        ]
+        bridge = TcpBridgeServer("127.0.0.1", 0, collector)
+        channel = bridge._channel_for(_RecordingWriter())
+
+        async def configure(settings):
+            return await bridge._handle_message(
+                json.dumps({"id": "c", "type": "configure", "settings": settings}).encode(
+                    "utf-8"
+                ),
+                object(),
+            )
+
+        invalid = await configure({"maxCache": 2, "pollFloorMs": 20000})
+        self.assertFalse(invalid["ok"])
+        self.assertIn("pollFloorMs", invalid["message"])
+        self.assertEqual(invalid["settings"]["maxCache"], 200)
+        unknown = await configure({"bogus": 1})
+        self.assertIn("unknown setting", unknown["message"])
+
+        response = await configure(
+            {"maxCache": 2, "pollIntervalMs": 500, "subscriberQueueSize": 8}
+        )
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["settings"]["maxCache"], 2)
+        self.assertEqual(response["settings"]["pollIntervalMs"], 500.0)
+        self.assertEqual(collector._poll_interval.base_seconds, 0.5)
+        self.assertEqual(channel.max_queue, 8)
+        self.assertEqual(
+            [record.title for record in collector._cache], ["Title 4", "Title 3"]
+        )
+
+    def test_config_file_provides_flag_defaults(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "daemon.json")
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({"maxCache": 50, "logLevel": "debug", "pollFloorMs": 100}, handle)
+
+        args = parse_args(["--config", path, "--max-cache", "70"])
+
+        self.assertEqual(args.max_cache, 70)
+        self.assertEqual(args.log_level, "DEBUG")
+        self.assertEqual(args.poll_floor_ms, 100.0)
+
+    async def test_stats_request_reports_refresh_phases_and_request_latency(self):
+        collector = NotificationCollector(asyncio.get_running_loop())
+        collector._available = True
+        collector._notification_kind_toast = 1
+        collector._listener = _SnapshotListener(
+            [_FakeItemWithId(index, f"Title {index}", "Body") for index in range(3)]
+        )
+        self.addAsyncCleanup(collector.stop)
+        await collector.refresh_snapshot()
+        bridge = TcpBridgeServer("127.0.0.1", 0, collector)
+
+        async def request(message_type):
+            return await bridge._handle_message(
+                json.dumps({"id": message_type, "type": message_type}).encode("utf-8"),
+                object(),
+            )
+
+        await request("ping")
+        await request("read_notifications")
+        stats = await request("stats")
+
+        self.assertTrue(stats["ok"])
+        # The fallback-mode read refreshed again but published nothing new.
+        refresh = stats["collector"]["refreshUs"]
+        for phase in ("fetch", "map", "total"):
+            self.assertEqual(refresh[phase]["count"], 2, phase)
+        self.assertEqual(refresh["serialize"]["count"], 1)
+        self.assertEqual(stats["collector"]["snapshotItems"]["max"], 3)
+        self.assertEqual(set(stats["requestsUs"]), {"ping", "read_notifications"})
+        self.assertEqual(stats["requestsUs"]["ping"]["count"], 1)
+        self.assertIn("eventLoopLagUs", stats)
+        self.assertEqual(stats["broadcasts"], 0)
+
+    async def test_metrics_endpoint_serves_openmetrics_without_refreshing(self):
+        collector = _CollectorWithSlowRefreshCounter(asyncio.get_running_loop())
+        bridge = TcpBridgeServer("127.0.0.1", 0, collector)
+        await bridge._handle_message(b'{"id": "p", "type": "ping"}', object())
+        exporter = OpenMetricsExporter(bridge.stats, "127.0.0.1", 0)
+        url = await exporter.start()
+        self.addAsyncCleanup(exporter.close)
+        port = int(url.rsplit(":", 1)[1].split("/")[0])
+
+        async def get(path):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("ascii"))
+            response = await reader.read()
+            writer.close()
+            return response.decode("utf-8")
+
+        response = await get("/metrics")
+        missing = await get("/")
+
+        head, body = response.split("\r\n\r\n", 1)
+        self.assertIn("200 OK", head)
+        self.assertIn("application/openmetrics-text", head)
+        self.assertIn("winrt_daemon_available 0", body)
+        self.assertIn('winrt_daemon_notification_kind_source_info{source="unknown"} 1', body)
+        self.assertIn('winrt_daemon_request_seconds_count{type="ping"} 1', body)
+        self.assertIn('winrt_daemon_subscribers{mode="full"} 0', body)
+        self.assertTrue(body.endswith("# EOF\n"))
+        self.assertIn("404", missing.split("\r\n", 1)[0])
+        self.assertEqual(collector.refresh_calls, 0)
+
+    async def test_metrics_endpoint_bounds_request_headers(self):
+        bridge = TcpBridgeServer(
+            "127.0.0.1", 0, NotificationCollector(asyncio.get_running_loop())
+        )
+        exporter = OpenMetricsExporter(bridge.stats, "127.0.0.1", 0)
+        exporter.READ_TIMEOUT_SECONDS = 0.2
+        url = await exporter.start()
+        self.addAsyncCleanup(exporter.close)
+        port = int(url.rsplit(":", 1)[1].split("/")[0])
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        headers = "".join(f"X-Filler-{index}: x\r\n" for index in range(150))
+        writer.write(f"GET /metrics HTTP/1.1\r\n{headers}\r\n".encode("ascii"))
+        response = await asyncio.wait_for(reader.readline(), 1)
+        writer.close()
+        self.assertIn(b"431", response)
+
+        # A client trickling headers is dropped once the read timeout passes.
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /metrics HTTP/1.1\r\n")
+        started = time.monotonic()
+        with self.assertRaises(ConnectionError):
+            for index in range(50):
+                writer.write(f"X-Slow-{index}: x\r\n".encode("ascii"))
+                await writer.drain()
+                await asyncio.sleep(0.02)
+        self.assertLess(time.monotonic() - started, 0.9)
+        writer.close()
+
+    async def test_profile_mode_records_spans_and_writes_profile_windows(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        collector = NotificationCollector(
+            asyncio.get_running_loop(),
+            profiler=PhaseProfiler(enabled=True, output_dir=directory.name),
+        )
+        collector._available = True
+        collector._notification_kind_toast = 1
+        collector._listener = _SnapshotListener(
+            [_FakeItemWithId(index, f"Title {index}", "Body") for index in range(3)]
+        )
+        self.addAsyncCleanup(collector.stop)
+        bridge = TcpBridgeServer("127.0.0.1", 0, collector)
+
+        async def request(message):
+            return await bridge._handle_message(json.dumps(message).encode("utf-8"), object())
+
+        started = await request({"id": "p", "type": "profile", "seconds": 0.2})
+        self.assertTrue(started["ok"])
+        busy = await request({"id": "p2", "type": "profile", "mode": "sample", "seconds": 1})
+        self.assertFalse(busy["ok"])
+        self.assertIn("already running", busy["message"])
+        await asyncio.sleep(0.05)  # let the window enable cProfile on the worker
+        await collector.refresh_snapshot()
+        await collector.profiler.wait_window()
+
+        spans = collector.metrics()["spansUs"]
+        self.assertEqual(spans["map.notification"]["count"], 3)
+        self.assertEqual(spans["fetch.get_notifications_async"]["count"], 1)
+        self.assertIn("publish.json_encode", spans)
+        profile = pstats.Stats(started["path"])
+        self.assertTrue(
+            any(function[2] == "_map_notification" for function in profile.stats)
+        )
+        with open(started["path"] + ".spans.json", encoding="utf-8") as handle:
+            self.assertIn("map.binding_probe", json.load(handle))
+
+        sampled = await request(
+            {"id": "s", "type": "profile", "mode": "sample", "seconds": 0.05}
+        )
+        await collector.profiler.wait_window()
+        self.assertTrue(os.path.exists(sampled["path"]))
+
+    async def test_profile_request_is_rejected_without_profile_mode(self):
+        bridge = TcpBridgeServer(
+            "127.0.0.1", 0, NotificationCollector(asyncio.get_running_loop())
+        )
+
+        response = await bridge._handle_message(b'{"id": "p", "type": "profile"}', object())
+
+        self.assertFalse(response["ok"])
+        self.assertIn("--profile", response["message"])
+        self.assertIsNone(bridge.collector.metrics()["spansUs"])
+
+    def test_histogram_percentiles_stay_within_bucket_precision(self):
+        histogram = Histogram()
+        for value in range(1, 10001):
+            histogram.record(value)
+
+        stats = histogram.stats()
+
+        self.assertEqual((stats["count"], stats["min"], stats["max"]), (10000, 1, 10000))
+        self.assertGreaterEqual(stats["p50"], 5000)
+        self.assertLessEqual(stats["p50"], 5000 * (1 + 1 / 32))
+        self.assertGreaterEqual(stats["p99"], 9900)
+        self.assertLessEqual(stats["p99"], 9900 * (1 + 1 / 32))
+        for value in range(1, 100000):
+            bucket_high = Histogram._bucket_high(Histogram._bucket(value))
+            self.assertLessEqual(value, bucket_high)
+            self.assertLessEqual(bucket_high, value * (1 + 1 / 32))
+        self.assertEqual(Histogram().stats()["p50"], None)
+
+    async def test_notification_changed_storm_is_coalesced_into_single_flight(self):
+        collector = _CollectorWithSlowRefreshCounter(asyncio.get_running_loop())
+
+        for _ in range(30):
+            collector._on_notification_changed(None, None)
+        await asyncio.sleep(0.03)
+        for _ in range(10):
+            collector._on_notification_changed(None, None)
+        await asyncio.sleep(0.2)
+
+        self.assertEqual(collector.refresh_calls, 2)
+        self.assertEqual(collector.max_active_refresh_calls, 1)
+        self.assertEqual(
+            collector.refresh_stats(),
+            {"requested": 40, "executed": 2, "coalesced": 38},
+        )
+
+    async def test_notification_changed_args_fetch_or_drop_single_notification(self):
+        collector = NotificationCollector(
+            asyncio.get_running_loop(), coalesce_window_seconds=0
+        )
+        collector._notification_kind_toast = 1
+        listener = _TargetedListener([_FakeItemWithId(1, "Title 1", "Body 1")])
+        collector._listener = listener
+        await collector.refresh_snapshot()
+
+        listener._notifications.append(_FakeItemWithId(2, "Title 2", "Body 2"))
+        collector._on_notification_changed(None, _ChangedEventArgs("Added", 2))
+        await asyncio.sleep(0.01)
+        collector._on_notification_changed(None, _ChangedEventArgs("REMOVED", 1))
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(listener.full_fetches, 1)
+        self.assertEqual(listener.single_fetches, [2])
+        self.assertEqual([item.title for item in collector._cache], ["Title 2"])
+
+        collector._on_notification_changed(None, _ChangedEventArgs("ADDED", 99))
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(listener.full_fetches, 2)
+        stats = collector.change_event_stats()
+        self.assertEqual(stats["targetedAdded"], 1)
+        self.assertEqual(stats["targetedRemoved"], 1)
+        self.assertEqual(stats["fullRefreshFallbacks"], 1)
+
+    async def test_targeted_changes_within_window_share_one_fetch_and_publish(self):
+        collector = NotificationCollector(
+            asyncio.get_running_loop(), coalesce_window_seconds=0.02
+        )
+        collector._notification_kind_toast = 1
+        listener = _TargetedListener([])
+        collector._listener = listener
+        await collector.refresh_snapshot()
+
+        publishes = []
+        publish = collector._publish_snapshot
+
+        async def counting_publish(records):
+            publishes.append(len(records))
+            return await publish(records)
+
+        collector._publish_snapshot = counting_publish
+        worker_jobs = []
+        run = collector._worker.run
+
+        async def counting_run(fn, *args):
+            worker_jobs.append(fn.__name__)
+            return await run(fn, *args)
+
+        collector._worker.run = counting_run
+        for index in range(1, 31):
+            listener._notifications.append(
+                _FakeItemWithId(index, f"Title {index}", "Body")
+            )
+            collector._on_notification_changed(None, _ChangedEventArgs("ADDED", index))
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(worker_jobs, ["_apply_changes_on_worker"])
+        self.assertEqual(publishes, [30])
+        self.assertEqual(listener.full_fetches, 1)
+        self.assertEqual(sorted(listener.single_fetches), list(range(1, 31)))
+        self.assertEqual(len(collector._cache), 30)
+        self.assertEqual(
+            collector.refresh_stats(),
+            {"requested": 30, "executed": 1, "coalesced": 29},
+        )
+        self.assertEqual(collector.change_event_stats()["targetedAdded"], 30)
+
+    async def test_refresh_maps_on_worker_thread_without_blocking_event_loop(self):
+        collector = _CollectorWithBlockingMap(asyncio.get_running_loop())
+        collector._notification_kind_toast = 1
+        collector._listener = _SnapshotListener(
+            [_FakeItemWithId(index, f"Title {index}", "Body") for index in range(4)]
+        )
+
+        refresh_task = asyncio.create_task(collector.refresh_snapshot())
+        started = time.monotonic()
+        await asyncio.sleep(0.01)
+        loop_lag = time.monotonic() - started
+        self.assertEqual(collector.worker_stats()["queueDepth"], 1)
+        await refresh_task
+        await collector.stop()
+
+        self.assertLess(loop_lag, 0.1)
+        self.assertEqual(collector.mapping_threads, {"winrt-worker"})
+        self.assertEqual(len(collector._cache), 4)
+        stats = collector.worker_stats()
+        self.assertEqual(stats["queueDepth"], 0)
+        self.assertEqual(stats["completed"], 1)
+
+    async def test_snapshot_version_changes_only_when_content_changes(self):
+        collector = NotificationCollector(asyncio.get_running_loop())
+        collector._available = True
+        broadcasts = []
+        collector.set_snapshot_callback(
+            lambda payload, version: broadcasts.append((len(payload), version))
+        )
+        first = NotificationRecord(timestamp="1", title="A", body=None, app="App")
+        same_content = NotificationRecord(timestamp="1", title="A", body=None, app="App")
+        second = NotificationRecord(timestamp="2", title="B", body="x", app="App")
+
+        self.assertEqual(first.fingerprint, same_content.fingerprint)
+        self.assertNotEqual(first.fingerprint, second.fingerprint)
+
+        self.assertTrue(await collector._publish_snapshot([first]))
+        self.assertFalse(await collector._publish_snapshot([same_content]))
+        self.assertTrue(await collector._publish_snapshot([first, second]))
+
+        self.assertEqual([count for count, _version in broadcasts], [1, 2])
+        self.assertNotEqual(broadcasts[0][1], broadcasts[1][1])
+        self.assertEqual(collector.read()["version"], broadcasts[1][1])
+
+    async def test_snapshot_is_encoded_once_and_spliced_into_reads_and_broadcasts(self):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        collector._available = True
+        collector._cache = [
+            NotificationRecord(
+                timestamp="2024-01-01T00:00:00.000000Z",
+                title="Ünïcødé 🥚",
+                body="line 1\nline 2",
+                app="TestApp",
+                notification_id=5,
+            )
+        ]
+        snapshot = collector.read()["notifications"]
+        self.assertIsInstance(snapshot, NotificationSnapshot)
+        encoded = snapshot.encoded()
+
+        bridge = TcpBridgeServer("127.0.0.1", 8765, collector)
+        subscriber = _RecordingWriter()
+        bridge._subscribers.add(subscriber)
+        await bridge.broadcast_notifications(snapshot, snapshot.version)
+        await bridge.flush_subscribers()
+        reader = _RecordingWriter()
+        for request_id in ("9", "10"):
+            response = await bridge._handle_message(
+                json.dumps({"id": request_id, "type": "read_notifications"}).encode(
+                    "utf-8"
+                ),
+                reader,
+            )
+            self.assertIn(encoded, _encode_frame(response))
+            reader.write(_encode_frame(response))
+
+        self.assertIs(snapshot.encoded(), encoded)
+        self.assertEqual([frame["id"] for frame in reader.frames], ["9", "10"])
+        for frame in reader.frames + subscriber.frames:
+            self.assertEqual(frame["notifications"], snapshot.payload())
+            self.assertEqual(frame["version"], snapshot.version)
+
+    async def test_unchanged_refresh_keeps_published_snapshot_and_encoding(self):
+        collector = NotificationCollector(asyncio.get_running_loop())
+        records = [
+            NotificationRecord(
+                timestamp="2024-01-01T00:00:00.000000Z",
+                title="Title",
+                body="Body",
+                app="TestApp",
+                notification_id=1,
+            )
+        ]
+        self.assertTrue(await collector._publish_snapshot(list(records)))
+        snapshot = collector._snapshot
+        encoded = snapshot.encoded()
+
+        self.assertFalse(await collector._publish_snapshot(list(records)))
+
+        self.assertIs(collector._snapshot, snapshot)
+        self.assertIs(collector._snapshot.encoded(), encoded)
+
+    async def _broadcast_to_slow_and_fast_subscribers(self, policy):
+        collector = _CollectorWithActivePush(asyncio.get_running_loop())
+        bridge = TcpBridgeServer(
+            "127.0.0.1",
+            8765,
+            collector,
+            subscriber_queue_size=2,
+            slow_consumer_policy=policy,
+        )
+        slow_writer = _BlockedWriter()
+        fast_writer = _RecordingWriter()
+        bridge._subscribers.update({slow_writer, fast_writer})
+
+        for index in range(1, 6):
+            await bridge.broadcast_notifications(
+                [_notification_payload(index, f"Title {index}")]
+            )
+            await asyncio.sleep(0)
+        await asyncio.wait_for(bridge._channels[fast_writer].flush(), timeout=1)
+        return bridge, slow_writer, fast_writer
+
+    async def test_slow_subscriber_does_not_delay_fast_subscriber(self):
+        bridge, slow_writer, fast_writer = (
+            await self._broadcast_to_slow_and_fast_subscribers("drop_oldest")
+        )
+
+        self.assertEqual([frame["seq"] for frame in fast_writer.frames], [1, 2, 3, 4, 5])
+        slow_stats = bridge._channels[slow_writer].stats()
+        # The first frame is already being written; two more fit in the queue.
+        self.assertEqual(slow_stats["droppedFrames"], 2)
+        self.assertEqual(slow_stats["queued"], 2)
+
+        slow_writer.unblock.set()
+        await bridge.flush_subscribers()
+        self.assertEqual([frame["seq"] for frame in slow_writer.frames], [1, 4, 5])
+        self.assertGreater(bridge._channels[slow_writer].stats()["maxLagMs"], 0)
+        self.assertEqual(len(bridge.subscriber_stats()), 2)
+
+    async def test_slow_subscriber_latest_snapshot_policy_collapses_queue(self):
+        bridge, slow_writer, _fast_writer = (
+            await self._broadcast_to_slow_and_fast_subscribers("latest_snapshot")
+        )
+
+        slow_writer.unblock.set()
+        await bridge.flush_subscribers()
+        self.assertEqual([frame["seq"] for frame in slow_writer.frames], [1, 4, 5])
+        self.assertEqual(bridge._channels[slow_writer].stats()["collapsedFrames"], 2)
+
+    async def test_slow_subscriber_disconnect_policy_drops_connection(self):
+        bridge, slow_writer, fast_writer = (
+            await self._broadcast_to_slow_and_fast_subscribers("disconnect")
+        )
+
+        self.assertTrue(slow_writer.closed)
+        self.assertEqual(bridge._subscribers, {fast_writer})
+        self.assertNotIn(slow_writer, bridge._channels)
+
+    def test_records_are_slotted_immutable_and_top_n_matches_full_sort(self):
+        record = NotificationRecord(timestamp="1", title="A", body=None, app="App")
+        self.assertFalse(hasattr(record, "__dict__"))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            record.title = "B"
+
+        records = [
+            NotificationRecord(
+                timestamp=None if index % 7 == 0 else f"{(index * 37) % 101:03d}",
+                title=f"Title {index}",
+                body=None,
+                app="App",
+            )
+            for index in range(300)
+        ]
+        expected = sorted(records, key=lambda item: item.timestamp or "", reverse=True)
+
+        self.assertEqual(_newest_records(records, 50), expected[:50])
+        self.assertEqual(_newest_records(records, 500), expected)
+
+    async def test_journal_assigns_seqs_and_warms_cache_after_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            collector = NotificationCollector(
+                asyncio.get_running_loop(),
+                journal=NotificationJournal(directory, segment_bytes=4096),
+            )
+            self.assertEqual(await collector.open_journal(), 0)
+            collector._notification_kind_toast = 1
+            listener = _SnapshotListener(
+                [
+                    _FakeItemWithId(index, f"Title {index}", "x" * 200)
+                    for index in range(1, 31)
+                ]
+            )
+            collector._listener = listener
+            await collector.refresh_snapshot()
+            await collector.refresh_snapshot()
+            listener._notifications.append(_FakeItemWithId(31, "Title 31", "Body"))
+            await collector.refresh_snapshot()
+
+            self.assertEqual(
+                sorted(item.seq for item in collector._cache), list(range(1, 32))
+            )
+            version = collector._snapshot.version
+            await collector.stop()
+            stats = collector.journal_stats()
+            self.assertEqual(stats["lastSeq"], 31)
+            self.assertEqual(stats["appended"], 31)
+            self.assertGreater(stats["rotations"], 1)
+
+            restarted = NotificationCollector(
+                asyncio.get_running_loop(),
+                journal=NotificationJournal(directory, segment_bytes=4096),
+            )
+            self.assertEqual(await restarted.open_journal(), 31)
+            payload = restarted.read()
+            self.assertTrue(payload["ok"])
+            self.assertEqual(payload["source"], "journal")
+            self.assertEqual(payload["version"], version)
+            self.assertEqual(
+                sorted(item["seq"] for item in payload["notifications"]),
+                list(range(1, 32)),
+            )
+
+            restarted._notification_kind_toast = 1
+            restarted._listener = listener
+            await restarted.refresh_snapshot()
+            listener._notifications.append(_FakeItemWithId(32, "Title 32", "Body"))
+            await restarted.refresh_snapshot()
+            await restarted.stop()
+            self.assertEqual(restarted.journal_stats()["lastSeq"], 32)
+            self.assertEqual(restarted.journal_stats()["appended"], 1)
+
+    async def test_named_consumer_resumes_from_acknowledged_cursor(self):
+        with tempfile.TemporaryDirectory() as directory:
+            collector = NotificationCollector(
+                asyncio.get_running_loop(),
+                journal=NotificationJournal(directory),
+            )
+            await collector.open_journal()
+            collector._notification_kind_toast = 1
+            listener = _SnapshotListener(
+                [_FakeItemWithId(index, f"Title {index}") for index in (1, 2, 3)]
+            )
+            collector._listener = listener
+            cursor_path = os.path.join(directory, "consumers.json")
+            bridge = TcpBridgeServer(
+                "127.0.0.1",
+                0,
+                collector,
+                cursor_store=ConsumerCursorStore(cursor_path),
+            )
+            collector.set_snapshot_callback(bridge.broadcast_notifications)
+            await collector.refresh_snapshot()
+
+            writer = _RecordingWriter()
+            subscribe = {"id": "s1", "type": "subscribe_notifications", "consumer": "bot"}
+            self.assertIsNone(
+                await bridge._handle_message(json.dumps(subscribe).encode("utf-8"), writer)
+            )
+            await bridge.flush_subscribers()
+            self.assertEqual(writer.frames[0]["cursor"], 0)
+            self.assertEqual(
+                [record["seq"] for record in writer.frames[1]["records"]], [1, 2, 3]
+            )
+            self.assertTrue(writer.frames[1]["catchUp"])
+
+            ack = {"id": "a1", "type": "ack_notifications", "consumer": "bot", "seq": 2}
+            response = await bridge._handle_message(json.dumps(ack).encode("utf-8"), writer)
+            self.assertEqual(response["cursor"], 2)
+
+            listener._notifications.append(_FakeItemWithId(4, "Title 4"))
+            await collector.refresh_snapshot()
+            await bridge.flush_subscribers()
+            self.assertEqual(writer.frames[-1]["type"], "notification_records")
+            self.assertEqual([record["seq"] for record in writer.frames[-1]["records"]], [4])
+            bridge._discard_subscriber(writer)
+
+            # Dismissed while the consumer was away: still delivered from the journal.
+            listener._notifications.append(_FakeItemWithId(5, "Title 5"))
+            await collector.refresh_snapshot()
+            del listener._notifications[-1]
+            await collector.refresh_snapshot()
+
+            store = ConsumerCursorStore(cursor_path)
+            store.load()
+            self.assertEqual(store.get("bot"), 2)
+            reconnected = _RecordingWriter()
+            await bridge._handle_message(json.dumps(subscribe).encode("utf-8"), reconnected)
+            await bridge.flush_subscribers()
+            self.assertEqual(reconnected.frames[0]["catchUpRecords"], 3)
+            self.assertFalse(reconnected.frames[0]["gap"])
+            self.assertEqual(
+                [record["seq"] for record in reconnected.frames[1]["records"]], [3, 4, 5]
+            )
+            await collector.stop()
+
+    async def test_named_consumer_catch_up_reports_rotated_out_records(self):
+        with tempfile.TemporaryDirectory() as directory:
+            journal = NotificationJournal(directory, segment_bytes=4096, max_segments=1)
+            journal.open()
+            for seq in range(1, 7):
+                journal.append(
+                    {"seq": seq, "title": f"Title {seq}", "body": "x" * 1500, "app": "App"}
+                )
+            journal.close()
+            collector = NotificationCollector(
+                asyncio.get_running_loop(),
+                journal=NotificationJournal(directory, segment_bytes=4096, max_segments=1),
+            )
+            await collector.open_journal()
+            bridge = TcpBridgeServer("127.0.0.1", 0, collector)
+
+            writer = _RecordingWriter()
+            subscribe = {"id": "s1", "type": "subscribe_notifications", "consumer": "bot"}
+            await bridge._handle_message(json.dumps(subscribe).encode("utf-8"), writer)
+            await bridge.flush_subscribers()
+
+            reply = writer.frames[0]
+            self.assertTrue(reply["gap"])
+            self.assertGreater(reply["oldestSeq"], 1)
+            self.assertEqual(
+                [record["seq"] for record in writer.frames[1]["records"]],
+                list(range(reply["oldestSeq"], 7)),
+            )
+            await collector.stop()
+
+    def test_journal_stats_count_segments_without_listing_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            journal = NotificationJournal(directory, segment_bytes=4096, max_segments=2)
+            journal.open()
+            for seq in range(1, 9):
+                journal.append({"seq": seq, "body": "x" * 1500})
+                journal.flush()
+
+            journal._segment_paths = lambda: self.fail("stats() listed the directory")
+            stats = journal.stats()
+            self.assertEqual(stats["segments"], len(os.listdir(directory)))
+            self.assertEqual(stats["segments"], 2)
+            self.assertGreater(stats["rotations"], 2)
+            del journal._segment_paths
+            journal.close()
+
+    def test_journal_stops_reading_at_torn_tail(self):
+        with tempfile.TemporaryDirectory() as directory:
+            journal = NotificationJournal(directory)
+            journal.open()
+            for seq in (1, 2):
+                journal.append({"seq": seq, "title": f"Title {seq}"})
+            journal.close()
+
+            segment_path = os.path.join(directory, os.listdir(directory)[0])
+            with open(segment_path, "r+b") as segment_file:
+                data = segment_file.read()
+                _, offset = NotificationJournal._scan(data)
+                segment_file.seek(offset)
+                segment_file.write(b"\x00\x00\x00\x40\xde\xad\xbe\xefpartial")
+
+            reopened = NotificationJournal(directory)
+            reopened.open()
+            self.assertEqual(reopened.last_seq, 2)
+            reopened.append({"seq": 3, "title": "Title 3"})
+            self.assertEqual(
+                [entry["seq"] for entry in reopened.tail(10)], [1, 2, 3]
+            )
+            reopened.close()
 
     async def test_start_logs_expected_fallbacks_as_info(self):
         collector = _CollectorWithTypingCandidate(asyncio.get_running_loop())